@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+
+from db.membership_snapshot import membership_snapshot
+from db.postgres import pool_stats
+from db.user_cache import user_cache
+from models.history import history_writer
+from security.token_cache import token_cache
+
+router = APIRouter()
+
+
+@router.get("/db")
+async def db_metrics() -> dict:
+    """Connection pool occupancy of this worker process."""
+
+    return pool_stats()
+
+
+@router.get("/cache")
+async def cache_metrics() -> dict:
+    """Hit ratios of the user record, memberships snapshot and verified token caches of this worker process."""
+
+    return {"user": user_cache.stats(), "memberships": membership_snapshot.stats(), "token": token_cache.stats()}
+
+
+@router.get("/history")
+async def history_metrics() -> dict:
+    """Login history write-behind buffer of this worker process."""
+
+    return history_writer.stats()
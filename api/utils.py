@@ -1,10 +1,35 @@
+import base64
+import binascii
+from datetime import datetime
 from typing import Annotated
+from uuid import UUID
 
-from fastapi import Query
+import orjson
+from fastapi import HTTPException, Query, Response
+from starlette import status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, id_: UUID) -> str:
+    """Opaque cursor of a row for keyset pagination on (created_at, id)."""
+
+    return base64.urlsafe_b64encode(orjson.dumps([created_at.isoformat(), str(id_)])).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        created_at, id_ = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), UUID(id_)
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
 
 
 class PaginateQueryParams:
-    """Dependency class to parse pagination query params."""
+    """Dependency class to parse pagination query params.
+
+    Pages are selected by `cursor` when it is given and by `page` offset otherwise.
+    """
 
     def __init__(
         self,
@@ -25,6 +50,22 @@ class PaginateQueryParams:
                 le=500,
             ),
         ] = 20,
+        cursor: Annotated[
+            str | None,
+            Query(
+                title="Продолжение",
+                description=f"Значение заголовка {NEXT_CURSOR_HEADER} предыдущей страницы",
+            ),
+        ] = None,
     ):
         self.page = page
         self.page_size = page_size
+        self.after = decode_cursor(cursor) if cursor is not None else None
+
+    def set_next_cursor(self, response: Response, items: list) -> list:
+        """Send the cursor of the next page in the header while the page is full."""
+
+        if len(items) == self.page_size:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(items[-1].created_at, items[-1].id)
+
+        return items
@@ -1,6 +1,8 @@
+from fastapi import Depends
 from fastapi.routing import APIRouter
 
-from security import ADMIN_REQUIRED, TOKEN_PROTECTED
+from db.postgres import use_primary
+from security import ADMIN_REQUIRED, TOKEN_PROTECTED, VERIFY_RATE_LIMITED
 
 from .auth import router as auth_router
 from .google import router as google_router
@@ -12,7 +14,9 @@ from .verify import router as verify_router
 router = APIRouter()
 router.include_router(auth_router, prefix="/auth", tags=["Auth"])
 router.include_router(google_router, prefix="/google", tags=["Google Auth"])
-router.include_router(verify_router, prefix="/verify", tags=["Verify"])
+router.include_router(verify_router, prefix="/verify", tags=["Verify"], dependencies=VERIFY_RATE_LIMITED)
 router.include_router(profile_router, prefix="/profile", tags=["Profile"], dependencies=TOKEN_PROTECTED)
-router.include_router(users_router, prefix="/users", tags=["Users"], dependencies=ADMIN_REQUIRED)
-router.include_router(organizations_router, prefix="/organizations", tags=["Organizations"])
+# Management endpoints read their own writes right away, so they do not read from the replica
+PRIMARY_DB = [Depends(use_primary)]
+router.include_router(users_router, prefix="/users", tags=["Users"], dependencies=PRIMARY_DB + ADMIN_REQUIRED)
+router.include_router(organizations_router, prefix="/organizations", tags=["Organizations"], dependencies=PRIMARY_DB)
@@ -1,26 +1,29 @@
 from hashlib import md5
 from uuid import UUID
 
-from async_fastapi_jwt_auth import AuthJWT
-from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from fastapi.encoders import jsonable_encoder
-from fastapi.security import HTTPAuthorizationCredentials
-from fastapi.security.http import HTTPBearer
 from redis.asyncio import Redis
 from sqlalchemy.exc import IntegrityError
 from starlette import status
 
-from core.settings import settings
+from db.membership_snapshot import membership_snapshot
 from db.redis_db import get_redis
-from models import History, Membership, User
+from models import User
+from models.history import history_writer
 from schemas import Tokens, UserCreated, UserLogin, UserRegistration, UserResponse
-from schemas.membership import MembershipResponse
-from security import REFRESH_TOKEN_PROTECTED, TOKEN_PROTECTED
+from security import LOGIN_RATE_LIMITED, REFRESH_TOKEN_PROTECTED, TOKEN_PROTECTED
+from security.jwt_auth import AuthJWT
+from security.login_throttle import login_throttle
+from security.rate_limit import client_ip
+from security.revocation import revoke_token, revoke_user_tokens
 
 router = APIRouter()
 
 
-@router.post("/signup", response_model=UserCreated, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/signup", response_model=UserCreated, status_code=status.HTTP_201_CREATED, dependencies=LOGIN_RATE_LIMITED
+)
 async def create_user(user_create: UserRegistration) -> UserCreated:
     user_dto = jsonable_encoder(user_create)
     try:
@@ -35,44 +38,30 @@ async def create_user(user_create: UserRegistration) -> UserCreated:
     return raw_user
 
 
-@router.post("/login", response_model=Tokens)
+@router.post("/login", response_model=Tokens, dependencies=LOGIN_RATE_LIMITED)
 async def login(
+    request: Request,
     user_login: UserLogin,
     user_agent: str = Header(default=None),
     x_org_id: UUID | None = Header(default=None, alias="X-Org-ID"),
     authorize: AuthJWT = Depends(),
+    redis: Redis = Depends(get_redis),
 ) -> Tokens:
-    db_user = await User.get_by_email(email=str(user_login.email))
-    if db_user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-        )
+    email, ip = str(user_login.email), client_ip(request)
+    await login_throttle.check(redis, email, ip)
 
-    if not db_user.check_password(user_login.password):
+    db_user = await User.get_for_login(email=email)
+    if db_user is None or not await db_user.check_password(user_login.password):
+        await login_throttle.record_failure(redis, email, ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
         )
 
-    # Load user memberships for multitenancy
-    memberships_db = await Membership.get_user_memberships(db_user.id)
-
-    # Create UserResponse with multitenancy data
-    user_data = {
-        "id": str(db_user.id),
-        "email": db_user.email,
-        "first_name": db_user.first_name,
-        "last_name": db_user.last_name,
-        "phone": db_user.phone,
-        "login": db_user.login,
-        "status": db_user.status,
-    }
+    await login_throttle.reset(redis, email, ip)
 
-    user = UserResponse.model_validate(user_data)
-    user.memberships = [
-        MembershipResponse.model_validate(membership, from_attributes=True) for membership in memberships_db
-    ]
+    # Claims with multitenancy data are built straight from the login lookup
+    user = UserResponse.model_validate(db_user, from_attributes=True)
     tokens = await Tokens.create(
         authorize=authorize,
         user=user,
@@ -80,11 +69,7 @@ async def login(
         org_id=None,
     )
 
-    db_history = History(
-        user_id=db_user.id,
-        user_agent=user_agent,
-    )
-    await db_history.save()
+    await history_writer.record(user_id=db_user.id, user_agent=user_agent)
 
     return tokens
 
@@ -94,21 +79,28 @@ async def logout(
     user_agent: str = Header(default=None),
     authorize: AuthJWT = Depends(),
     redis: Redis = Depends(get_redis),
-    credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer(auto_error=False)),
 ) -> dict:
-    access_key = await authorize.get_jwt_subject()
-    access_token_expires = settings.authjwt_access_token_expires
-    current_access_token = credentials.credentials
-    await redis.sadd(access_key, current_access_token)
-    await redis.expire(access_key, time=access_token_expires)
-
     user_claim = await authorize.get_raw_jwt()
+    await revoke_token(redis, user_claim)
+
     user_agent_hash = md5(user_agent.encode()).hexdigest()
     refresh_key = f"refresh.{user_claim['user_id']}.{user_agent_hash}"
     await redis.delete(refresh_key)
     return {}
 
 
+@router.post("/logout_all", dependencies=TOKEN_PROTECTED)
+async def logout_all(
+    authorize: AuthJWT = Depends(),
+    redis: Redis = Depends(get_redis),
+) -> dict:
+    """Revoke all access and refresh tokens of the user on every device."""
+
+    user_claim = await authorize.get_raw_jwt()
+    await revoke_user_tokens(redis, user_claim["user_id"])
+    return {}
+
+
 @router.post("/refresh", dependencies=REFRESH_TOKEN_PROTECTED)
 async def refresh(
     user_agent: str = Header(default=None),
@@ -121,11 +113,20 @@ async def refresh(
 
     user_claims = await authorize.get_raw_jwt()
 
-    # Handle organization switching during refresh
-    target_org = None
-    target_org = x_org_id if x_org_id and x_org_id in user_claims["org_roles"] else user_claims["org"]
+    async def load_user() -> dict | None:
+        # From the primary past user_cache, the snapshot is stamped with the version read before
+        user_db = await User.get_by_id(UUID(user_claims["user_id"]), without_cache=True)
+        return UserResponse.model_validate(user_db, from_attributes=True).model_dump(mode="json") if user_db else None
+
+    # Claims are rebuilt from the memberships snapshot, Postgres is read only after a membership change
+    user_data = await membership_snapshot.get(user_claims["user_id"], load_user)
+    if user_data is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
-    user_db = await User.get_by_id(UUID(user_claims["user_id"]))
-    user = UserResponse.model_validate(user_db, from_attributes=True)
+    user = UserResponse.model_validate(user_data)
+
+    # Handle organization switching during refresh
+    org_ids = {str(membership.org_id) for membership in user.memberships}
+    target_org = x_org_id if x_org_id and x_org_id in org_ids else user_claims["org"]
 
     return await Tokens.create(authorize=authorize, user=user, user_agent=user_agent, org_id=target_org)
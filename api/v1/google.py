@@ -1,6 +1,5 @@
 from typing import Annotated
 
-from async_fastapi_jwt_auth import AuthJWT
 from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from fastapi.encoders import jsonable_encoder
 from fastapi.logger import logger
@@ -12,7 +11,8 @@ from starlette import status
 
 from constants import GOOGLE_SCOPES, SocialType
 from core.settings import settings
-from models import History, Social, User
+from models import Social, User
+from models.history import history_writer
 from schemas import (
     GoogleToken,
     SocialDB,
@@ -22,11 +22,13 @@ from schemas import (
     UserInfo,
     UserResponse,
 )
+from security import LOGIN_RATE_LIMITED
+from security.jwt_auth import AuthJWT
 
 router = APIRouter()
 
 
-@router.post("/auth", response_model=GoogleToken)
+@router.post("/auth", response_model=GoogleToken, dependencies=LOGIN_RATE_LIMITED)
 async def auth():
     flow = Flow.from_client_config(
         client_config=settings.google_client_config,
@@ -39,7 +41,7 @@ async def auth():
     return RedirectResponse(auth_uri[0])
 
 
-@router.get("/auth_return", response_model=Tokens)
+@router.get("/auth_return", response_model=Tokens, dependencies=LOGIN_RATE_LIMITED)
 async def auth_return(
     code: Annotated[str | None, Query()] = None,
     error: Annotated[str | None, Query()] = None,
@@ -107,10 +109,6 @@ async def auth_return(
         user_agent=user_agent,
     )
 
-    db_history = History(
-        user_id=db_user.id,
-        user_agent=user_agent,
-    )
-    await db_history.save()
+    await history_writer.record(user_id=db_user.id, user_agent=user_agent)
 
     return tokens
@@ -1,11 +1,14 @@
 from uuid import UUID, uuid4
 
-from async_fastapi_jwt_auth import AuthJWT
 from fastapi import APIRouter, Depends, HTTPException
+from redis.asyncio import Redis
 from sqlalchemy.exc import IntegrityError
 from starlette import status
 
+from db.membership_snapshot import membership_snapshot
 from db.postgres import get_session
+from db.redis_db import get_redis
+from db.user_cache import user_cache
 from models import Membership, MembershipRole, Organization
 from schemas import UserResponse
 from schemas.membership import (
@@ -24,6 +27,8 @@ from security import (
     TOKEN_PROTECTED,
     multitenancy_protected,
 )
+from security.jwt_auth import AuthJWT
+from security.quotas import plan_cache, release_seat, reserve_seat
 
 router = APIRouter()
 
@@ -67,6 +72,9 @@ async def create_organization(
         await session.commit()
         await session.refresh(new_org)
 
+    await user_cache.invalidate(user_claims["user_id"])
+    await membership_snapshot.bump(user_claims["user_id"])
+
     return OrganizationResponse(
         id=new_org.id, name=new_org.name, slug=new_org.slug, plan=new_org.plan, status=new_org.status
     )
@@ -127,6 +135,7 @@ async def update_organization(
         setattr(org, field, value)
 
     await org.save(current_org=current_org)
+    plan_cache.invalidate(str(org_id))
     return OrganizationResponse.model_validate(org, from_attributes=True)
 
 
@@ -150,6 +159,7 @@ async def create_membership(
     org_id: UUID,
     membership_create: MembershipCreate,
     auth_data: tuple[AuthJWT, UserResponse, str] = Depends(multitenancy_protected),
+    redis: Redis = Depends(get_redis),
 ) -> MembershipResponse:
     """Add a user to organization. Requires admin or owner role."""
 
@@ -160,11 +170,17 @@ async def create_membership(
     if not org:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found")
 
+    if not await reserve_seat(redis, org_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Organization seat limit for the plan is reached"
+        )
+
     # Create membership
     membership_data = membership_create.model_dump()
     try:
         new_membership = await Membership.create(**membership_data, org_id=org_id)
     except IntegrityError:
+        await release_seat(redis, org_id)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Membership already exists for this user in this organization",
@@ -211,7 +227,10 @@ async def update_membership(
     "/{org_id}/memberships/{membership_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=ADMIN_REQUIRED
 )
 async def delete_membership(
-    org_id: UUID, membership_id: UUID, auth_data: tuple[AuthJWT, UserResponse, str] = Depends(multitenancy_protected)
+    org_id: UUID,
+    membership_id: UUID,
+    auth_data: tuple[AuthJWT, UserResponse, str] = Depends(multitenancy_protected),
+    redis: Redis = Depends(get_redis),
 ):
     """Remove user from organization. Requires admin or owner role."""
     authorize, user_claims, current_org = auth_data
@@ -221,3 +240,4 @@ async def delete_membership(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Membership not found")
 
     await membership.delete()
+    await release_seat(redis, org_id)
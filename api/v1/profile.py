@@ -1,13 +1,14 @@
+from datetime import datetime
 from typing import Annotated
 
-from async_fastapi_jwt_auth import AuthJWT
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.exc import IntegrityError
 from starlette import status
 
 from models import History, User
 from schemas import HistoryInDB, UserChangePassword, UserResponse, UserUpdate
+from security.jwt_auth import AuthJWT
 
 from ..utils import PaginateQueryParams
 
@@ -21,25 +22,34 @@ async def user(authorize: AuthJWT = Depends()):
 
 @router.get("/history", response_model=list[HistoryInDB])
 async def history(
+    response: Response,
     paginate: Annotated[PaginateQueryParams, Depends(PaginateQueryParams)],
+    since: datetime | None = None,
+    until: datetime | None = None,
     authorize: AuthJWT = Depends(),
 ) -> list[History]:
+    """Login history, newest first. Bounded by `since` and `until` it reads only the months in between."""
+
     user_claim = await authorize.get_raw_jwt()
-    return await History.get_by_user_id(
+    history = await History.get_by_user_id(
         user_id=user_claim["user_id"],
         page=paginate.page,
         page_size=paginate.page_size,
+        after=paginate.after,
+        since=since,
+        until=until,
     )
+    return paginate.set_next_cursor(response, history)
 
 
 @router.post("/update", response_model=UserResponse)
 async def change_user(user_update: UserUpdate, authorize: AuthJWT = Depends()):
     user_claim = await authorize.get_raw_jwt()
-    db_user = await User.get_by_email(email=user_claim["email"])
+    db_user = await User.get_for_login(email=user_claim["email"])
     if db_user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect userdata")
 
-    if not db_user.check_password(user_update.current_password):
+    if not await db_user.check_password(user_update.current_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect password")
 
     user_dto = user_update.model_dump(exclude_none=True, exclude={"current_password"})
@@ -59,11 +69,11 @@ async def change_user(user_update: UserUpdate, authorize: AuthJWT = Depends()):
 async def change_password(user_change_password: UserChangePassword, authorize: AuthJWT = Depends()):
     user_claim = await authorize.get_raw_jwt()
 
-    db_user = await User.get_by_email(email=user_claim["email"])
+    db_user = await User.get_for_login(email=user_claim["email"])
     if db_user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect userdata")
 
-    if not db_user.check_password(user_change_password.current_password):
+    if not await db_user.check_password(user_change_password.current_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect password")
 
     user_dto = jsonable_encoder(user_change_password)
@@ -1,38 +1,55 @@
+from typing import Annotated
 from uuid import UUID
 
-from async_fastapi_jwt_auth import AuthJWT
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from redis.asyncio import Redis
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
 from starlette import status
 
+from constants import MembershipRole, UserStatus
+from db.membership_snapshot import membership_snapshot
 from db.postgres import get_session
+from db.redis_db import get_redis
 from models import Membership, Organization, User
 from schemas import UserCreate, UserInDB, UserUpdateByAdmin
 from schemas.membership import MembershipResponse
 from schemas.user import UserResponse
 from security import multitenancy_protected
+from security.jwt_auth import AuthJWT
+from security.quotas import release_seat, reserve_seat
+
+from ..utils import PaginateQueryParams
 
 router = APIRouter()
 
 
 @router.post("/", response_model=UserResponse)
 async def create_user(
-    user_create: UserCreate, auth_data: tuple[AuthJWT, UserResponse, str] = Depends(multitenancy_protected)
+    user_create: UserCreate,
+    auth_data: tuple[AuthJWT, UserResponse, str] = Depends(multitenancy_protected),
+    redis: Redis = Depends(get_redis),
 ) -> UserResponse:
     """Create a new user. Only admins can create users."""
 
     authorize, user_claims, current_org = auth_data
 
+    user_data = user_create.model_dump(exclude={"repeat_password", "role"})
+    new_user_db = await User.build(**user_data)
+
+    if not await reserve_seat(redis, current_org):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Organization seat limit for the plan is reached"
+        )
+
     async with get_session(current_org) as session:
-        user_data = user_create.model_dump(exclude={"repeat_password", "role"})
-        new_user_db = User(**user_data)
         session.add(new_user_db)
         try:
             await session.flush()
         except IntegrityError:
             await session.rollback()
+            await release_seat(redis, current_org)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="User with this phone or email already exists"
             )
@@ -50,6 +67,8 @@ async def create_user(
         await session.refresh(new_user_db)
         await session.refresh(new_membership_db)
 
+    await membership_snapshot.bump(new_user_db.id)
+
     return UserResponse(
         id=new_user_db.id,
         email=new_user_db.email,
@@ -63,24 +82,26 @@ async def create_user(
 
 
 @router.get("/", response_model=list[UserInDB])
-async def get_users(auth_data: tuple[AuthJWT, UserResponse, str] = Depends(multitenancy_protected)) -> list[User]:
-    authorize, user_claims, current_org = auth_data
-
-    async with get_session(current_org) as session:
-        request = (
-            select(Organization).options(joinedload(Organization.memberships)).where(Organization.id == current_org)
-        )
-        result = await session.execute(request)
-        org = result.scalars().first()
-        if not org:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found")
+async def get_users(
+    response: Response,
+    paginate: Annotated[PaginateQueryParams, Depends(PaginateQueryParams)],
+    role: MembershipRole | None = None,
+    user_status: UserStatus | None = Query(default=None, alias="status"),
+    auth_data: tuple[AuthJWT, UserResponse, str] = Depends(multitenancy_protected),
+) -> list[User]:
+    """Users of the current organization, one query per page."""
 
-        users = []
-        for membership in org.memberships:
-            user_db = await User.get_by_id(id_=membership.user_id)
-            users.append(UserResponse.model_validate(user_db))
+    authorize, user_claims, current_org = auth_data
 
-    return users
+    users = await User.get_org_users(
+        current_org,
+        page=paginate.page,
+        page_size=paginate.page_size,
+        after=paginate.after,
+        role=role,
+        status=user_status,
+    )
+    return paginate.set_next_cursor(response, users)
 
 
 @router.get("/{id}", response_model=UserInDB)
@@ -148,7 +169,11 @@ async def update_user(
 
 
 @router.delete("/{id}", response_model=UserInDB)
-async def delete_user(id: UUID, auth_data: tuple[AuthJWT, UserResponse, str] = Depends(multitenancy_protected)) -> User:
+async def delete_user(
+    id: UUID,
+    auth_data: tuple[AuthJWT, UserResponse, str] = Depends(multitenancy_protected),
+    redis: Redis = Depends(get_redis),
+) -> User:
     authorize, user_claims, current_org = auth_data
 
     async with get_session(current_org) as session:
@@ -169,4 +194,9 @@ async def delete_user(id: UUID, auth_data: tuple[AuthJWT, UserResponse, str] = D
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User doesn't exists")
 
-    return await user.delete()
+    org_ids = {membership.org_id for membership in user.memberships}
+    deleted_user = await user.delete()
+    for org_id in org_ids:
+        await release_seat(redis, org_id)
+
+    return deleted_user
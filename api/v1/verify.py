@@ -1,12 +1,21 @@
 from uuid import UUID
 
-from async_fastapi_jwt_auth import AuthJWT
-from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from redis.asyncio import Redis
 from starlette import status
 
-from models import History, User
+from db.redis_db import get_redis
+from models import User
+from models.history import history_writer
 from schemas import UserResponse
-from security import TOKEN_PROTECTED, multitenancy_protected
+from schemas.verify import IntrospectionRequest, PermissionBatch, PermissionResult, TokenBatch, TokenVerification
+from security import GATEWAY_PROTECTED, TOKEN_PROTECTED, multitenancy_protected
+from security.auth import authenticate, full_protected
+from security.introspection import introspect
+from security.jwt_auth import AuthJWT
+from security.scopes import org_scope_mask, scope_mask
+from security.token_batch import check_permissions, claims_for_org, verify_token_batch
 
 router = APIRouter()
 
@@ -24,11 +33,87 @@ async def login(
             detail="User not found",
         )
 
-    db_history = History(
-        user_id=db_user.id,
-        user_agent=user_agent,
-    )
-    await db_history.save()
+    await history_writer.record(user_id=db_user.id, user_agent=user_agent)
 
     user = UserResponse.model_validate(db_user, from_attributes=True)
     return user.to_user_claims(current_org)
+
+
+@router.post("/tokens", response_model=list[TokenVerification], dependencies=GATEWAY_PROTECTED)
+async def verify_tokens(batch: TokenBatch, redis: Redis = Depends(get_redis)) -> list[dict]:
+    """Verify the access tokens of many in-flight requests of a gateway in one call.
+
+    Results follow the order of the tokens, a rejected token does not fail the others.
+    Only gateways from VERIFY_CLIENTS may call it, within GATEWAY_REQUEST_LIMIT per IP.
+    AuthJWT is not bound to the request, Authorization carries the client credentials.
+    """
+
+    checks = [(check.token, str(check.org_id) if check.org_id else None) for check in batch.tokens]
+    return await verify_token_batch(AuthJWT(), redis, checks)
+
+
+@router.post("/introspect", dependencies=GATEWAY_PROTECTED)
+async def introspect_token(request: IntrospectionRequest, redis: Redis = Depends(get_redis)) -> ORJSONResponse:
+    """Token introspection (RFC 7662) without a database round trip.
+
+    Active answers may be cached by the gateway until the token expires. The caller
+    authenticates as a gateway client (RFC 7662, section 2.1), like for /tokens.
+    """
+
+    content, expires_in = await introspect(AuthJWT(), redis, request.token)
+    cache_control = f"max-age={expires_in}" if expires_in else "no-store"
+    return ORJSONResponse(content=content, headers={"Cache-Control": cache_control})
+
+
+@router.api_route("/auth", methods=["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"], response_class=Response)
+async def auth_request(
+    request: Request,
+    authorize: AuthJWT = Depends(),
+    redis: Redis = Depends(get_redis),
+) -> Response:
+    """Subrequest check for nginx `auth_request` and Envoy `ext_authz`.
+
+    Runs the full_protected, multitenancy_protected and scope_required checks without
+    a body: 200 with X-User-Id, X-Org-Id and X-Scopes headers, 401 for a missing or
+    invalid token, 403 otherwise. X-Required-Scopes lists the scopes the proxied route
+    needs, separated by spaces. nginx takes any other status of the subrequest for an
+    error, so an exceeded rate limit or organization quota (429) is answered with 403
+    that keeps Retry-After; a 403 with Retry-After means "retry later".
+    """
+
+    try:
+        await authenticate(request, authorize, redis, org_quota=True)
+        _, user_claims, org_id = await multitenancy_protected(
+            authorize, x_org_id=request.headers.get("X-Org-ID"), credentials=None
+        )
+    except HTTPException as e:
+        # 429 becomes 403 with Retry-After, see above
+        unauthorized = e.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        code = status.HTTP_401_UNAUTHORIZED if unauthorized else status.HTTP_403_FORBIDDEN
+        return Response(status_code=code, headers=e.headers)
+
+    required = scope_mask(request.headers.get("X-Required-Scopes", "").split())
+    if required & ~org_scope_mask(user_claims["org_roles"], org_id):
+        return Response(status_code=status.HTTP_403_FORBIDDEN)
+
+    user_claims = claims_for_org(user_claims, org_id if org_id != user_claims["org"] else None)
+
+    return Response(
+        headers={"X-User-Id": user_claims["user_id"], "X-Org-Id": org_id, "X-Scopes": user_claims["scopes"]}
+    )
+
+
+@router.post("/permissions", response_model=list[PermissionResult])
+async def verify_permissions(batch: PermissionBatch, authorize: AuthJWT = Depends(full_protected)) -> list[dict]:
+    """Check many scopes of the token owner, each in its organization, in one call.
+
+    Roles come from the `org_roles` claim and are mapped to scopes by role_to_scopes,
+    results follow the order of the checks.
+    """
+
+    user_claims = await authorize.get_raw_jwt()
+    checks = [(check.scope, str(check.org_id)) for check in batch.checks]
+    return [
+        {"scope": scope, "org_id": org_id, "allowed": allowed}
+        for (scope, org_id), allowed in zip(checks, check_permissions(user_claims, checks), strict=True)
+    ]
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+
+from core.settings import settings
+from security.keys import get_key_ring
+
+router = APIRouter()
+
+
+@router.get("/jwks.json")
+async def jwks() -> ORJSONResponse:
+    """Public keys for local verification of tokens by downstream services."""
+
+    key_ring = get_key_ring()
+    return ORJSONResponse(
+        content=key_ring.jwks() if key_ring is not None else {"keys": []},
+        headers={"Cache-Control": f"public, max-age={settings.jwks_cache_max_age}"},
+    )
@@ -0,0 +1,99 @@
+"""Cost of the auth dependency chain with and without the verified-token cache.
+
+Runs full_protected + multitenancy_protected + scope_required for the same token,
+the way FastAPI resolves them for a protected endpoint. Redis is replaced by a
+stub that lets every request through to measure token handling only.
+
+    python -m benchmarks.auth_chain --iterations 20000
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.requests import Request
+
+from schemas import UserResponse
+from security.auth import full_protected, multitenancy_protected, scope_required
+from security.jwt_auth import AuthJWT
+from security.token_cache import token_cache
+
+ORG_ID = "6f1b5c3e-2b7a-4a0e-9a55-1d0c2b8c6a10"
+USER_ID = "345fa6c5-c138-4f5c-bce5-a35b0f26fced"
+USER = {
+    "id": USER_ID,
+    "email": "bench@example.com",
+    "phone": "0123456789",
+    "first_name": "Bench",
+    "last_name": "User",
+    "memberships": [
+        {"id": "0b9d7c4e-8f1a-4d2b-9c3e-5a6b7c8d9e0f", "org_id": ORG_ID, "user_id": USER_ID, "role": "dispatcher"}
+    ],
+}
+
+
+class NullScript:
+    def __init__(self, redis):
+        self.registered_client = redis
+
+    async def __call__(self, keys, args):
+        return [0, -1, -1]
+
+
+class NullRedis:
+    """Redis stub: nothing is revoked, every session is alive."""
+
+    async def mget(self, *names):
+        return [None] * len(names)
+
+    def register_script(self, script):
+        return NullScript(self)
+
+
+async def create_token() -> str:
+    user = UserResponse.model_validate(USER)
+    user_claims = jsonable_encoder(user.to_user_claims(ORG_ID))
+    return await AuthJWT().create_access_token(subject=f"access.{USER_ID}.bench", user_claims=user_claims)
+
+
+def make_request(token: str) -> Request:
+    return Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+async def chain(token: str, redis: NullRedis) -> None:
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    request = make_request(token)
+    authorize = await full_protected(request=request, authorize=AuthJWT(req=request), redis=redis)
+    auth_data = await multitenancy_protected(authorize=authorize, x_org_id=None, credentials=credentials)
+    await scope_required(["routes:read"])(auth_data=auth_data)
+
+
+async def run(name: str, token: str, iterations: int) -> None:
+    redis = NullRedis()
+    token_cache.clear()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await chain(token, redis)
+    elapsed = time.perf_counter() - started
+    print(
+        f"{name:>9}: {iterations} chains in {elapsed:.2f}s, {elapsed / iterations * 1e6:.1f}us per request, "
+        f"cache={token_cache.stats()}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    token = await create_token()
+
+    maxsize = token_cache.maxsize
+    token_cache.maxsize = 0
+    await run("no cache", token, args.iterations)
+    token_cache.maxsize = maxsize or 10000
+    await run("cache", token, args.iterations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,75 @@
+"""Redis round trips and latency of the auth checks in full_protected.
+
+Compares the chain of separate calls (INCR+EXPIRE pipeline of a fixed-window
+counter, then MGET of the revocation marks, then EXISTS of the session) with the
+single EVALSHA of the auth gate script. Needs a running Redis at REDIS_HOST:REDIS_PORT.
+
+    python -m benchmarks.auth_gate --iterations 5000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from redis.asyncio import Redis
+
+from core.settings import settings
+from security.auth_gate import check_auth_gate, session_key
+from security.rate_limit import RateLimitPolicy
+from security.revocation import is_token_revoked
+
+POLICY = RateLimitPolicy(name="bench", requests=10**9)
+
+
+async def legacy_chain(redis: Redis, user_claims: dict) -> None:
+    key = f"bench.{user_claims['user_id']}:{time.localtime().tm_min}"
+    pipe = redis.pipeline()
+    pipe.incr(key, 1)
+    pipe.expire(key, 60)
+    await pipe.execute()
+    await is_token_revoked(redis, user_claims)
+    await redis.exists(session_key(user_claims))
+
+
+async def gate_chain(redis: Redis, user_claims: dict) -> None:
+    await check_auth_gate(redis, user_claims, POLICY)
+
+
+async def run(name: str, chain, round_trips: int, redis: Redis, args: argparse.Namespace) -> None:
+    users = [
+        {"jti": str(uuid.uuid4()), "user_id": str(uuid.uuid4()), "iat": int(time.time()), "sub": f"access.{i}.bench"}
+        for i in range(args.concurrency)
+    ]
+    latencies = []
+
+    async def worker(user_claims: dict) -> None:
+        await redis.set(session_key(user_claims), 1, ex=300)
+        for _ in range(args.iterations // args.concurrency):
+            started = time.perf_counter()
+            await chain(redis, user_claims)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(user) for user in users))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(
+        f"{name:>6}: round trips/request={round_trips} requests={len(latencies)} rps={len(latencies) / elapsed:.0f} "
+        f"p50={statistics.median(latencies):.3f}ms p99={latencies[int(len(latencies) * 0.99) - 1]:.3f}ms"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    redis = Redis(host=settings.redis_host, port=settings.redis_port, db=0, decode_responses=True)
+    await run("legacy", legacy_chain, 3, redis, args)
+    await run("gate", gate_chain, 1, redis, args)
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,78 @@
+"""Per-request cost of the auth_request subrequest check against /verify/token.
+
+Both endpoints are called in-process through the ASGI app with the token of the first
+user that has a membership. Organization quotas are switched off for the run, the verify
+rate limit is switched off with VERIFY_REQUEST_LIMIT=0.
+Needs a running Postgres from POSTGRES_* settings and Redis at REDIS_HOST:REDIS_PORT.
+
+    VERIFY_REQUEST_LIMIT=0 python -m benchmarks.auth_request --requests 5000 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from db import redis_db
+from db.postgres import get_read_session
+from main import app, lifespan
+from models import User
+from schemas import UserResponse
+from security.jwt_auth import AuthJWT
+from security.quotas import PLAN_POLICIES
+from security.rate_limit import RateLimitKey, RateLimitPolicy
+
+
+async def create_headers() -> dict:
+    async with get_read_session() as session:
+        request = select(User).join(User.memberships).options(joinedload(User.memberships)).limit(1)
+        db_user = (await session.execute(request)).unique().scalars().one()
+
+    org_id = str(db_user.memberships[0].org_id)
+    user_claims = UserResponse.model_validate(db_user, from_attributes=True).to_user_claims(org_id)
+    token = await AuthJWT().create_access_token(subject=f"access.{db_user.id}.bench", user_claims=user_claims)
+    await redis_db.redis.set(f"refresh.{db_user.id}.bench", "bench")
+    return {"Authorization": f"Bearer {token}", "X-Request-Id": "benchmark", "X-Org-ID": org_id}
+
+
+async def run(name: str, method: str, url: str, client: httpx.AsyncClient, headers: dict, args) -> None:
+    latencies = []
+
+    async def worker() -> None:
+        for _ in range(args.requests // args.concurrency):
+            started = time.perf_counter()
+            response = await client.request(method, url, headers=headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(
+        f"{name:>12}: requests={len(latencies)} requests/s={len(latencies) / elapsed:.0f} "
+        f"p50={statistics.median(latencies):.3f}ms p99={latencies[int(len(latencies) * 0.99) - 1]:.3f}ms"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    for plan, policy in PLAN_POLICIES.items():
+        PLAN_POLICIES[plan] = RateLimitPolicy(name=policy.name, requests=0, key=RateLimitKey.ORG)
+
+    async with lifespan(app):
+        headers = await create_headers()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await run("verify/token", "POST", "/api/v1/verify/token", client, headers, args)
+            await run("auth_request", "GET", "/api/v1/verify/auth", client, headers, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,74 @@
+"""Argon2 CPU spent on a credential-stuffing run against one account with and without LoginThrottle.
+
+Every attempt carries a wrong password. Without the throttle each attempt costs a full
+verification; with it only the attempts before the lockout reach the hasher.
+Needs a running Redis at REDIS_HOST:REDIS_PORT.
+
+    python -m benchmarks.login_throttle --attempts 200 --ips 4
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from fastapi import HTTPException
+from redis.asyncio import Redis
+
+from core.settings import settings
+from security.login_throttle import LoginThrottle
+from security.passwords import PasswordHashingService
+
+
+async def attack(redis: Redis, throttle: LoginThrottle | None, hasher: PasswordHashingService, args) -> None:
+    password_hash = await hasher.hash("password")
+    email = f"{uuid.uuid4()}@bench.test"
+    verified = 0
+
+    started = time.perf_counter()
+    for attempt in range(args.attempts):
+        ip = f"10.0.0.{attempt % args.ips}"
+        if throttle is not None:
+            try:
+                await throttle.check(redis, email, ip)
+            except HTTPException:
+                continue
+
+        await hasher.verify(password_hash, "wrong")
+        verified += 1
+        if throttle is not None:
+            await throttle.record_failure(redis, email, ip)
+
+    elapsed = time.perf_counter() - started
+    cpu_time = verified * hasher.average_verify_cpu_time
+    name = "throttled" if throttle is not None else "open"
+    saved = f" saved hash cpu={throttle.saved_hash_cpu_time:.2f}s" if throttle is not None else ""
+    print(
+        f"{name:>9}: attempts={args.attempts} verified={verified} hash cpu={cpu_time:.2f}s "
+        f"elapsed={elapsed:.2f}s{saved}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    redis = Redis(host=settings.redis_host, port=settings.redis_port, db=0, decode_responses=True)
+    hasher = PasswordHashingService(workers=1, queue_size=0)
+    throttle = LoginThrottle(
+        max_email_failures=settings.login_max_failures_per_email,
+        max_ip_failures=settings.login_max_failures_per_ip,
+        window=settings.login_failure_window,
+        base_lockout=settings.login_lockout_base,
+        max_lockout=settings.login_lockout_max,
+        hasher=hasher,
+    )
+
+    await attack(redis, None, hasher, args)
+    await attack(redis, throttle, hasher, args)
+    hasher.shutdown()
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attempts", type=int, default=200)
+    parser.add_argument("--ips", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
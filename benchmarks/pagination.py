@@ -0,0 +1,77 @@
+"""Latency of one login history page by offset and by cursor at growing depth.
+
+Seeds one user with `--rows` history records, then reads the page starting after
+`depth` records with OFFSET and with the (created_at, id) keyset of IDMixin.paginate.
+The seeded user is deleted afterwards. Needs a migrated Postgres from POSTGRES_* settings.
+
+    python -m benchmarks.pagination --rows 200000 --depths 10 1000 100000 --page-size 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from uuid import uuid4
+
+import sqlalchemy
+
+from db.postgres import engine, get_session
+from models import History
+
+SEED_USER = sqlalchemy.text(
+    "INSERT INTO users (id, email, phone, status, created_at, updated_at) "
+    "VALUES (:id, :email, :phone, 'ACTIVE', now(), now())"
+)
+SEED_HISTORY = sqlalchemy.text(
+    "INSERT INTO history (id, user_id, user_agent, created_at, updated_at) "
+    "SELECT gen_random_uuid(), :user_id, 'benchmark', now() - make_interval(secs => n), now() "
+    "FROM generate_series(1, :rows) AS n"
+)
+
+
+async def timed(query, repeat: int) -> float:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await query()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    return statistics.median(latencies)
+
+
+async def main(args: argparse.Namespace) -> None:
+    user_id = uuid4()
+    async with get_session() as session:
+        await session.execute(SEED_USER, {"id": user_id, "email": f"{user_id}@bench.test", "phone": str(user_id)})
+        await session.execute(SEED_HISTORY, {"user_id": user_id, "rows": args.rows})
+        await session.execute(sqlalchemy.text("ANALYZE history"))
+        await session.commit()
+
+    try:
+        for depth in args.depths:
+            page = depth // args.page_size + 1
+            # The last record of the previous page, as the client gets it in X-Next-Cursor
+            (last,) = await History.get_by_user_id(user_id, page=depth, page_size=1)
+            after = (last.created_at, last.id)
+
+            offset_ms = await timed(
+                lambda page=page: History.get_by_user_id(user_id, page=page, page_size=args.page_size), args.repeat
+            )
+            cursor_ms = await timed(
+                lambda after=after: History.get_by_user_id(user_id, page_size=args.page_size, after=after), args.repeat
+            )
+            print(f"depth={depth:>7}: offset p50={offset_ms:.3f}ms cursor p50={cursor_ms:.3f}ms")
+    finally:
+        async with get_session() as session:
+            await session.execute(sqlalchemy.text("DELETE FROM users WHERE id = :id"), {"id": user_id})
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--depths", type=int, nargs="+", default=[10, 1000, 100_000])
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
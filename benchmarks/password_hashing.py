@@ -0,0 +1,87 @@
+"""Latency of cheap requests on the event loop during a login storm.
+
+Compares the legacy inline Argon2 verification with PasswordHashingService.
+
+    python -m benchmarks.password_hashing --logins 200 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from security.passwords import PasswordHasherBusyError, PasswordHashingService, ph
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, round(pct / 100 * (len(values) - 1)))
+    return values[index]
+
+
+async def cheap_requests(stop: asyncio.Event, interval: float) -> list[float]:
+    """Emulate `/verify/token` style calls: schedule, yield once, measure lag."""
+
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0)
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(interval)
+
+    return latencies
+
+
+async def login_storm(verify, password_hash: str, logins: int, concurrency: int) -> int:
+    semaphore = asyncio.Semaphore(concurrency)
+    rejected = 0
+
+    async def one_login():
+        nonlocal rejected
+        async with semaphore:
+            try:
+                await verify(password_hash, "password")
+            except PasswordHasherBusyError:
+                rejected += 1
+
+    await asyncio.gather(*(one_login() for _ in range(logins)))
+    return rejected
+
+
+async def run(name: str, verify, password_hash: str, args: argparse.Namespace) -> None:
+    stop = asyncio.Event()
+    probe = asyncio.create_task(cheap_requests(stop, args.interval / 1000))
+    started = time.perf_counter()
+    rejected = await login_storm(verify, password_hash, args.logins, args.concurrency)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    latencies = await probe
+
+    print(
+        f"{name:>8}: logins={args.logins} in {elapsed:.2f}s rejected={rejected} "
+        f"probes={len(latencies)} p50={statistics.median(latencies):.2f}ms "
+        f"p99={percentile(latencies, 99):.2f}ms max={max(latencies):.2f}ms"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    password_hash = ph.hash("password")
+
+    async def inline_verify(hash_: str, password: str) -> bool:
+        return ph.verify(hash_, password)
+
+    service = PasswordHashingService(workers=args.workers, queue_size=args.queue_size, executor=args.executor)
+    await run("inline", inline_verify, password_hash, args)
+    await run("pool", service.verify, password_hash, args)
+    service.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--interval", type=float, default=5.0, help="Probe interval, ms")
+    asyncio.run(main(parser.parse_args()))
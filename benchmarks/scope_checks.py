@@ -0,0 +1,85 @@
+"""Authorization checks of a protected endpoint with the compiled bitmask policy and the legacy one.
+
+Every iteration runs what a dispatcher endpoint does after the token is verified:
+scope_required, dispatcher_required, Membership.has_role and a permission lookup of
+role_to_scopes. The legacy variants rebuild the role->scopes dict and scan strings
+and lists the way security/scopes.py and security/auth.py did before. No services needed.
+
+    python -m benchmarks.scope_checks --iterations 100000
+"""
+
+import argparse
+import asyncio
+import time
+
+from constants import MembershipRole
+from models import Membership
+from security.auth import dispatcher_required, scope_required
+from security.scopes import UserRole, _build_role_scopes, org_scope_mask, scope_mask
+
+ORG_ID = "6f1b5c3e-2b7a-4a0e-9a55-1d0c2b8c6a10"
+USER_ID = "345fa6c5-c138-4f5c-bce5-a35b0f26fced"
+REQUIRED_SCOPES = ["routes:read", "routes:write"]
+
+
+def legacy_role_to_scopes(role: str) -> list[str]:
+    return _build_role_scopes().get(UserRole(role), [])
+
+
+def legacy_has_role(role: str, required_role: str) -> bool:
+    role_hierarchy = {
+        MembershipRole.VIEWER: 1,
+        MembershipRole.COURIER: 2,
+        MembershipRole.DISPATCHER: 3,
+        MembershipRole.ADMIN: 4,
+        MembershipRole.OWNER: 5,
+    }
+    return role_hierarchy.get(role, 0) >= role_hierarchy.get(required_role, 0)
+
+
+async def legacy_chain(auth_data: tuple) -> None:
+    _, user_claims, org_id = auth_data
+    scopes = user_claims["scopes"].split()
+    assert not [scope for scope in REQUIRED_SCOPES if scope not in scopes]
+
+    user_roles = user_claims["org_roles"].get(org_id, [])
+    assert any(role in user_roles for role in ["dispatcher", "admin", "owner"])
+    assert legacy_has_role(user_roles[-1], MembershipRole.DISPATCHER)
+    assert "couriers:write" in legacy_role_to_scopes(user_roles[-1])
+
+
+async def compiled_chain(auth_data: tuple, scope_check, membership: Membership, couriers_write: int) -> None:
+    await scope_check(auth_data=auth_data)
+    await dispatcher_required(auth_data=auth_data)
+    assert membership.has_role(MembershipRole.DISPATCHER)
+    assert couriers_write & org_scope_mask(auth_data[1]["org_roles"], auth_data[2])
+
+
+async def run(name: str, chain, iterations: int) -> None:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await chain()
+    elapsed = time.perf_counter() - started
+    print(f"{name:>8}: {iterations} chains in {elapsed:.2f}s, {elapsed / iterations * 1e6:.2f}us per request")
+
+
+async def main(args: argparse.Namespace) -> None:
+    user_claims = {
+        "user_id": USER_ID,
+        "org_roles": {ORG_ID: [MembershipRole.DISPATCHER.value]},
+        "org": ORG_ID,
+        "scopes": " ".join(sorted(legacy_role_to_scopes(MembershipRole.DISPATCHER))),
+    }
+    auth_data = (None, user_claims, ORG_ID)
+    scope_check = scope_required(REQUIRED_SCOPES)
+    membership = Membership(org_id=ORG_ID, user_id=USER_ID, role=MembershipRole.DISPATCHER)
+    couriers_write = scope_mask(["couriers:write"])
+
+    await run("legacy", lambda: legacy_chain(auth_data), args.iterations)
+    await run("compiled", lambda: compiled_chain(auth_data, scope_check, membership, couriers_write), args.iterations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100000)
+    asyncio.run(main(parser.parse_args()))
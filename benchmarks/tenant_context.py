@@ -0,0 +1,67 @@
+"""Per-session overhead of applying the tenant (`app.org_id`) for RLS.
+
+Compares the legacy separate `SELECT set_config(..., false)` statement with the
+tenant sent together with BEGIN by get_session. Every session runs one SELECT.
+Needs a running Postgres from POSTGRES_* settings.
+
+    python -m benchmarks.tenant_context --sessions 2000 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from uuid import uuid4
+
+import sqlalchemy
+
+from db.postgres import _async_session, engine, get_session
+
+QUERY = sqlalchemy.text("SELECT current_setting('app.org_id', true)")
+
+
+async def legacy_session(org_id: str) -> None:
+    async with _async_session() as session:
+        await session.execute(sqlalchemy.text("SELECT set_config('app.org_id', :org_id, false)"), {"org_id": org_id})
+        await session.execute(QUERY)
+        await session.commit()
+
+
+async def piggybacked_session(org_id: str) -> None:
+    async with get_session(org_id) as session:
+        await session.execute(QUERY)
+
+
+async def run(name: str, session_func, args: argparse.Namespace) -> None:
+    orgs = [str(uuid4()) for _ in range(args.concurrency)]
+    latencies = []
+
+    async def worker(org_id: str) -> None:
+        for _ in range(args.sessions // args.concurrency):
+            started = time.perf_counter()
+            await session_func(org_id)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(org_id) for org_id in orgs))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(
+        f"{name:>11}: sessions={len(latencies)} sessions/s={len(latencies) / elapsed:.0f} "
+        f"p50={statistics.median(latencies):.3f}ms p99={latencies[int(len(latencies) * 0.99) - 1]:.3f}ms"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    for name, session_func in (("legacy", legacy_session), ("piggybacked", piggybacked_session)):
+        # Open the pool connections first, the legacy setting lingers on them, so the pool is dropped after each run
+        await asyncio.gather(*(session_func(str(uuid4())) for _ in range(args.concurrency)))
+        await run(name, session_func, args)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
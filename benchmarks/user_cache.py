@@ -0,0 +1,65 @@
+"""User lookups on the token verification path with and without the Redis user cache.
+
+Every lookup is User.get_by_id with memberships for one of the first `--users` users,
+as done by the profile and users endpoints after the token is verified.
+Needs a running Postgres from POSTGRES_* settings with some users and Redis at REDIS_HOST:REDIS_PORT.
+
+    python -m benchmarks.user_cache --lookups 5000 --users 100 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+
+from core.settings import settings
+from db import redis_db
+from db.postgres import get_read_session
+from db.user_cache import user_cache
+from models import User
+
+
+async def run(name: str, user_ids: list, args: argparse.Namespace) -> None:
+    latencies = []
+
+    async def worker(offset: int) -> None:
+        for lookup in range(args.lookups // args.concurrency):
+            started = time.perf_counter()
+            await User.get_by_id(user_ids[(offset + lookup) % len(user_ids)])
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(offset) for offset in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(
+        f"{name:>8}: lookups={len(latencies)} lookups/s={len(latencies) / elapsed:.0f} "
+        f"p50={statistics.median(latencies):.3f}ms p99={latencies[int(len(latencies) * 0.99) - 1]:.3f}ms"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    redis_db.redis = Redis(host=settings.redis_host, port=settings.redis_port, db=0, decode_responses=True)
+    async with get_read_session() as session:
+        user_ids = (await session.execute(select(User.id).limit(args.users))).scalars().all()
+
+    user_cache.ttl = 0
+    await run("uncached", user_ids, args)
+
+    user_cache.ttl = settings.user_cache_ttl or 300
+    for user_id in user_ids:
+        await user_cache.invalidate(user_id)
+    await run("cached", user_ids, args)
+    print(f"user cache: {user_cache.stats()}")
+    await redis_db.redis.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -33,6 +33,21 @@ class MembershipRole(StrEnum):
     VIEWER = "viewer"
 
 
+# Roles are declared from the highest, each role is a bit for bitwise role checks
+ROLE_BITS = {role: 1 << index for index, role in enumerate(MembershipRole)}
+# Mask of the role and every role above it
+ROLES_AT_LEAST = {role: (1 << (index + 1)) - 1 for index, role in enumerate(MembershipRole)}
+ALL_ROLES = (1 << len(MembershipRole)) - 1
+
+
+def role_mask(roles: list[str]) -> int:
+    mask = 0
+    for role in roles:
+        mask |= ROLE_BITS.get(role, 0)
+
+    return mask
+
+
 class Plan(StrEnum):
     FREE = "free"
     BASIC = "basic"
@@ -1,5 +1,6 @@
 from datetime import timedelta
 from logging import config as logging_config
+from typing import Literal
 
 from async_fastapi_jwt_auth import AuthJWT
 from pydantic import PostgresDsn
@@ -22,6 +23,19 @@ class PostgresSettings(BaseSettings):
     postgres_app_password: str
     postgres_migrate_user: str
     postgres_migrate_password: str
+    # Реплика только для чтения (hot standby), без хоста все запросы идут в основную БД
+    postgres_replica_host: str | None = None
+    postgres_replica_port: int | None = None
+    # Пул соединений на процесс: всего соединений = воркеры * (pool_size + max_overflow)
+    postgres_pool_size: int = 5
+    postgres_max_overflow: int = 10
+    postgres_pool_timeout: int = 30
+    postgres_pool_recycle: int = 1800
+    postgres_pool_pre_ping: bool = False
+    # Кеш подготовленных выражений asyncpg на соединение
+    postgres_statement_cache_size: int = 100
+    # PgBouncer в режиме transaction pooling: без кеша подготовленных выражений
+    postgres_pgbouncer: bool = False
 
     @property
     def pg_dsn(self) -> PostgresDsn:
@@ -34,6 +48,20 @@ class PostgresSettings(BaseSettings):
             path=self.postgres_db,
         )
 
+    @property
+    def replica_pg_dsn(self) -> PostgresDsn | None:
+        if not self.postgres_replica_host:
+            return None
+
+        return PostgresDsn.build(
+            scheme="postgresql+asyncpg",
+            username=self.postgres_app_user,
+            password=self.postgres_app_password,
+            host=self.postgres_replica_host,
+            port=self.postgres_replica_port or self.postgres_port,
+            path=self.postgres_db,
+        )
+
     @property
     def migrate_pg_dsn(self) -> PostgresDsn:
         return PostgresDsn.build(
@@ -50,6 +78,8 @@ class Settings(PostgresSettings):
     # Общие настройки
     project_name: str = "Auth"
     debug: bool = False
+    # Отдавать внутренние метрики (пул соединений) по /metrics
+    metrics_enabled: bool = False
 
     # Настройки Redis
     redis_host: str = "127.0.0.1"
@@ -59,6 +89,28 @@ class Settings(PostgresSettings):
     authjwt_secret_key: str = "secret"
     authjwt_access_token_expires_minutes: int | None = None
     authjwt_refresh_token_expires_days: int | None = None
+    # Асимметричная подпись RS256/EdDSA: каталог ключей <kid>.pem и активный kid
+    authjwt_keys_dir: str | None = None
+    authjwt_signing_kid: str | None = None
+    jwks_cache_max_age: int = 3600
+    # Кеш проверенных токенов: размер (0 - выключен) и максимальное время жизни записи, сек
+    token_cache_size: int = 10000
+    token_cache_max_ttl: int = 300
+    # Максимум токенов в запросе /verify/tokens и проверок в запросе /verify/permissions
+    verify_batch_size: int = 100
+    # Шлюзы, которым доступны /verify/tokens и /verify/introspect: client_id -> secret (HTTP Basic)
+    verify_clients: dict[str, str] = {}
+
+    # Отложенная запись истории входов пачками раз в N мс (0 - запись в каждом запросе),
+    # размер пачки и предел записей в памяти воркера
+    history_flush_ms: int = 1000
+    history_batch_size: int = 500
+    history_max_pending: int = 10000
+    # Помесячные партиции истории: сколько месяцев создавать вперед и сколько хранить (0 - бессрочно)
+    history_partitions_ahead: int = 3
+    history_retention_months: int = 12
+    # Кеш записей пользователей в Redis, сек (0 - выключен)
+    user_cache_ttl: int = 300
 
     # Настройки Google Auth
     google_redirect_uri: str = "http://localhost:8000/google/auth"
@@ -70,8 +122,35 @@ class Settings(PostgresSettings):
     jaeger_agent_host: str = "localhost"
     jaeger_agent_port: int = 6831
 
-    # Настройки лимитирования запросов
+    # Настройки лимитирования запросов (запросов в минуту, 0 - без ограничений)
     request_limit: int = 20
+    verify_request_limit: int = 600
+    login_request_limit: int = 10
+    gateway_request_limit: int = 6000
+    # Защита входа от перебора: число неудачных попыток на email и на IP (0 - без ограничений)
+    # за окно login_failure_window, сек, после которого вход блокируется на login_lockout_base, сек,
+    # и удваивается за каждую следующую неудачу до login_lockout_max, сек
+    login_max_failures_per_email: int = 5
+    login_max_failures_per_ip: int = 50
+    login_failure_window: int = 900
+    login_lockout_base: int = 30
+    login_lockout_max: int = 900
+    # Время кеширования тарифа организации для квот, сек
+    org_plan_cache_ttl: int = 300
+    # Локальный подсчет лимитов: синхронизация в Redis раз в N мс (0 - каждый запрос в Redis)
+    # и число запросов на корзину, которое воркер может пропустить между синхронизациями
+    rate_limit_sync_ms: int = 0
+    rate_limit_local_overshoot: int = 10
+    # Брать IP клиента из X-Forwarded-For (только за доверенным прокси)
+    rate_limit_trust_proxy: bool = False
+
+    # Отклонять access-токены сессий, завершенных через logout или истечение refresh-токена
+    auth_session_check: bool = True
+
+    # Настройки хеширования паролей
+    password_hash_workers: int = 4
+    password_hash_queue_size: int = 64
+    password_hash_executor: Literal["thread", "process"] = "thread"
 
     @property
     def authjwt_access_token_expires(self) -> timedelta:
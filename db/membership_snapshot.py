@@ -0,0 +1,91 @@
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from uuid import UUID
+
+import orjson
+
+from core.settings import settings
+from db import redis_db
+from db.postgres import after_commit, in_write_transaction
+
+# KEYS: version key; ARGV: TTL. The new version is a string: Redis keeps only 14 digits of a Lua number.
+BUMP_LUA = """
+local time = redis.call('TIME')
+local version = tonumber(time[1]) * 1000000 + tonumber(time[2])
+local previous = tonumber(redis.call('GET', KEYS[1]))
+if previous and previous >= version then
+    version = previous + 1
+end
+redis.call('SET', KEYS[1], string.format('%d', version), 'EX', ARGV[1])
+"""
+
+
+class MembershipSnapshot:
+    """Per-user snapshot of the data token claims are built from, stamped with a version.
+
+    `memberships_version.<user_id>` is bumped on every change of the user's memberships
+    or profile, `memberships_snapshot.<user_id>` keeps the claims source (UserResponse
+    as JSON) with the version it was read at. While the versions match, refresh and
+    organization switching rebuild claims without Postgres. The version is read before
+    the database, so a change racing with a load leaves the snapshot stale.
+    Both keys live `ttl` (the refresh token lifetime). The version is the Redis time in
+    microseconds, at least the previous version + 1, so a version key that expired and
+    is bumped again never repeats a stamp an older snapshot may carry.
+    """
+
+    def __init__(self, ttl: timedelta) -> None:
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def version_key(user_id: UUID | str) -> str:
+        return f"memberships_version.{user_id}"
+
+    @staticmethod
+    def snapshot_key(user_id: UUID | str) -> str:
+        return f"memberships_snapshot.{user_id}"
+
+    async def get(self, user_id: UUID | str, loader: Callable[[], Awaitable[dict | None]]) -> dict | None:
+        """Claims source of the user, from the snapshot while its version is current."""
+
+        redis = redis_db.redis
+        if redis is None:
+            return await loader()
+
+        version, cached = await redis.mget(self.version_key(user_id), self.snapshot_key(user_id))
+        version = int(version or 0)
+        if cached is not None:
+            snapshot = orjson.loads(cached)
+            if snapshot["version"] == version:
+                self.hits += 1
+                return snapshot["user"]
+
+        self.misses += 1
+        user = await loader()
+        # Uncommitted writes of this request must not leak to other requests
+        if user is not None and not in_write_transaction():
+            snapshot = orjson.dumps({"version": version, "user": user})
+            await redis.set(self.snapshot_key(user_id), snapshot, ex=self.ttl)
+
+        return user
+
+    async def bump(self, user_id: UUID | str) -> None:
+        """Outdate the snapshot now and once more after the transaction is committed."""
+
+        if redis_db.redis is None:
+            return
+
+        async def bump() -> None:
+            script = redis_db.get_script(redis_db.redis, BUMP_LUA)
+            await script(keys=[self.version_key(user_id)], args=[int(self.ttl.total_seconds())])
+
+        await bump()
+        if in_write_transaction():
+            await after_commit(bump)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+membership_snapshot = MembershipSnapshot(ttl=settings.authjwt_refresh_token_expires)
@@ -1,15 +1,26 @@
 import logging
+import time
 import uuid
 from asyncio import shield
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Awaitable, Callable
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from uuid import UUID
 
+import asyncpg
 import sqlalchemy
 from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+from sqlalchemy import event
 from sqlalchemy.exc import DBAPIError
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from constants import DEFAULT_ORG_ID
 from core.settings import settings
@@ -17,32 +28,304 @@ from core.settings import settings
 logger = logging.getLogger(__name__)
 
 
+class TenantConnection(asyncpg.Connection):
+    """asyncpg connection that applies the tenant of the current checkout at BEGIN.
+
+    `app.org_id` is set transaction-locally in the same simple query as BEGIN, so
+    RLS context costs no extra round trip and ends with the transaction. The tenant
+    is cleared when the connection is returned to the pool.
+    """
+
+    __slots__ = ("tenant",)
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.tenant: str | None = None
+
+    async def execute(self, query: str, *args, timeout: float | None = None) -> str:
+        if self.tenant is not None and not args and query.startswith("BEGIN"):
+            query = f"{query} SELECT set_config('app.org_id', '{self.tenant}', true);"
+
+        return await super().execute(query, *args, timeout=timeout)
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """Queue pool that also measures how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_time += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(0, self.overflow()),
+            "checkouts": self.checkouts,
+            "avg_wait_ms": round(self.wait_time / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+def _connect_args() -> dict:
+    connect_args = {"connection_class": TenantConnection}
+    if settings.postgres_pgbouncer:
+        # Transaction pooling may run each statement on another server connection:
+        # no named prepared statements may outlive the transaction
+        connect_args |= {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    else:
+        connect_args |= {
+            "statement_cache_size": settings.postgres_statement_cache_size,
+            "prepared_statement_cache_size": settings.postgres_statement_cache_size,
+        }
+
+    return connect_args
+
+
+def _reset_tenant(dbapi_connection, connection_record) -> None:
+    if dbapi_connection is not None:
+        dbapi_connection.driver_connection.tenant = None
+
+
+def _create_engine(dsn: str) -> AsyncEngine:
+    db_engine = create_async_engine(
+        dsn,
+        echo=settings.debug,
+        future=True,
+        poolclass=MeteredPool,
+        pool_size=settings.postgres_pool_size,
+        max_overflow=settings.postgres_max_overflow,
+        pool_timeout=settings.postgres_pool_timeout,
+        pool_recycle=settings.postgres_pool_recycle,
+        pool_pre_ping=settings.postgres_pool_pre_ping,
+        connect_args=_connect_args(),
+    )
+    event.listen(db_engine.sync_engine.pool, "checkin", _reset_tenant)
+
+    if settings.jaeger_trace:
+        SQLAlchemyInstrumentor().instrument(engine=db_engine.sync_engine)
+
+    return db_engine
+
+
 Base = declarative_base()
-engine = create_async_engine(settings.pg_dsn.encoded_string(), echo=settings.debug, future=True)
+engine = _create_engine(settings.pg_dsn.encoded_string())
 _async_session = async_sessionmaker(engine, expire_on_commit=False)
 
-if settings.jaeger_trace:
-    SQLAlchemyInstrumentor().instrument(engine=engine.sync_engine)
+# Hot standby for read-only lookups, reads go to the primary when it is not configured
+replica_engine = _create_engine(settings.replica_pg_dsn.encoded_string()) if settings.replica_pg_dsn else None
+_read_session = async_sessionmaker(replica_engine or engine, expire_on_commit=False)
+
+
+async def _set_org(session: AsyncSession, org_id: UUID | str) -> None:
+    """Bind the session's connection to the organization for RLS.
+
+    Before the transaction has started the org is sent together with BEGIN,
+    inside a running transaction it is set by a separate statement.
+    """
+
+    # UUID round trip: the value is inlined into the BEGIN query
+    org_id = str(UUID(str(org_id)))
+    connection = await session.connection()
+    driver_connection = (await connection.get_raw_connection()).driver_connection
+    driver_connection.tenant = org_id
+    if driver_connection.is_in_transaction():
+        await session.execute(
+            sqlalchemy.text("SELECT set_config('app.org_id', :org_id, true)"),
+            {"org_id": org_id},
+        )
+
+
+class UnitOfWork:
+    """One connection and one transaction shared by every get_session() of a request.
+
+    The connection is checked out on the first get_session() call, so requests that
+    do not touch the database cost nothing. Model helpers join the shared session:
+    their commit() only flushes, the transaction is committed by unit_of_work when
+    the request succeeds and rolled back when it fails. `app.org_id` is changed
+    only when the organization changes.
+
+    Lookups through get_read_session use a second, read-only connection to the
+    replica until the request writes something or `primary_only` is set; after
+    that they read from the primary transaction to see the request's own writes.
+    """
+
+    def __init__(self) -> None:
+        self._connection: AsyncConnection | None = None
+        self._session: AsyncSession | None = None
+        self._org_id: str | None = None
+        self._replica: AsyncConnection | None = None
+        self._replica_org_id: str | None = None
+        self.wrote = False
+        self.primary_only = False
+        self._after_commit: list[Callable[[], Awaitable]] = []
+
+    @property
+    def reads_from_primary(self) -> bool:
+        return replica_engine is None or self.primary_only or self.wrote
+
+    def _after_flush(self, session, flush_context) -> None:
+        self.wrote = True
+
+    async def join(self, org_id: UUID | str) -> AsyncSession:
+        if self._session is None:
+            self._connection = await engine.connect()
+            await self._connection.begin()
+            self._session = _async_session(bind=self._connection, join_transaction_mode="rollback_only")
+            event.listen(self._session.sync_session, "after_flush", self._after_flush)
+            logger.debug("Unit of work BEGIN;")
+
+        # The connection keeps the org for the transactions started after a rollback
+        org_id = str(org_id)
+        if org_id != self._org_id:
+            await _set_org(self._session, org_id)
+            self._org_id = org_id
+
+        return self._session
+
+    async def join_replica(self, org_id: UUID | str) -> AsyncSession:
+        """Session on the request's replica connection, the caller closes it to detach loaded objects."""
+
+        if self._replica is None:
+            self._replica = await replica_engine.connect()
+            await self._replica.begin()
+
+        session = _read_session(bind=self._replica, join_transaction_mode="rollback_only")
+        org_id = str(org_id)
+        if org_id != self._replica_org_id:
+            await _set_org(session, org_id)
+            self._replica_org_id = org_id
+
+        return session
+
+    async def commit(self) -> None:
+        if self._session is None:
+            return
+
+        await self._session.flush()
+        if self._connection.in_transaction():
+            await self._connection.commit()
+            logger.debug("Unit of work COMMIT;")
+
+        for callback in self._after_commit:
+            await callback()
+
+    async def rollback(self) -> None:
+        if self._connection is not None and self._connection.in_transaction():
+            await self._connection.rollback()
+
+    async def close(self) -> None:
+        if self._replica is not None:
+            await shield(self._replica.close())
+            self._replica = None
+
+        if self._session is not None:
+            await shield(self._session.close())
+            await shield(self._connection.close())
+            self._session = self._connection = None
+            logger.debug("Connection released to pool")
+
+
+_unit_of_work: ContextVar[UnitOfWork | None] = ContextVar("unit_of_work", default=None)
+
+
+def in_write_transaction() -> bool:
+    """True inside a request that has written data not committed yet."""
+
+    uow = _unit_of_work.get()
+    return uow is not None and uow.wrote
+
+
+async def after_commit(callback: Callable[[], Awaitable]) -> None:
+    """Run the callback once the request's transaction is committed, right away outside a request."""
+
+    uow = _unit_of_work.get()
+    if uow is not None and uow.wrote:
+        uow._after_commit.append(callback)
+    else:
+        await callback()
+
+
+async def use_primary() -> None:
+    """Dependency sending all reads of the request to the primary (read-your-writes across requests)."""
+
+    uow = _unit_of_work.get()
+    if uow is not None:
+        uow.primary_only = True
+
+
+async def unit_of_work() -> AsyncGenerator[UnitOfWork]:
+    """Dependency that makes all database calls of the request share one connection and transaction."""
+
+    uow = UnitOfWork()
+    token = _unit_of_work.set(uow)
+    try:
+        yield uow
+        await uow.commit()
+
+    except Exception:
+        await uow.rollback()
+        raise
+
+    finally:
+        _unit_of_work.reset(token)
+        await uow.close()
 
 
 @asynccontextmanager
 async def get_session(
     org_id: UUID = DEFAULT_ORG_ID,
 ) -> AsyncGenerator[AsyncSession]:
-    """Dependency that provides an async session for database operations."""
+    """Dependency that provides an async session for database operations.
+
+    Inside a request the session of its unit of work is returned, otherwise a new one.
+    """
 
     if org_id is None:
         raise ValueError("org_id must be provided")
 
+    uow = _unit_of_work.get()
+    if uow is not None:
+        yield await uow.join(org_id)
+        return
+
+    async with get_own_session(org_id) as session:
+        yield session
+
+
+@asynccontextmanager
+async def get_own_session(
+    org_id: UUID = DEFAULT_ORG_ID,
+) -> AsyncGenerator[AsyncSession]:
+    """Session with its own connection and transaction, committed on exit, even inside a request.
+
+    For work done on behalf of other requests, it never joins the request's unit of work.
+    """
+
     session: AsyncSession = _async_session()
     xid = uuid.uuid4()
     try:
         logger.debug("Transaction BEGIN;", extra={"xid": xid})
 
-        await session.execute(
-            sqlalchemy.text("SELECT set_config('app.org_id', :org_id, false)"),
-            {"org_id": str(org_id) if isinstance(org_id, UUID) else org_id},
-        )
+        await _set_org(session, org_id)
 
         yield session
         await session.commit()
@@ -62,6 +345,48 @@ async def get_session(
             logger.debug("Connection released to pool")
 
 
+@asynccontextmanager
+async def get_read_session(
+    org_id: UUID = DEFAULT_ORG_ID,
+) -> AsyncGenerator[AsyncSession]:
+    """Session for read-only lookups, served by the replica when it is configured.
+
+    Inside a request that has written or uses the primary only, the primary session
+    of its unit of work is returned, so the request reads its own writes.
+    """
+
+    if org_id is None:
+        raise ValueError("org_id must be provided")
+
+    uow = _unit_of_work.get()
+    if replica_engine is None or (uow is not None and uow.reads_from_primary):
+        async with get_session(org_id) as session:
+            yield session
+        return
+
+    if uow is not None:
+        session = await uow.join_replica(org_id)
+        try:
+            yield session
+        finally:
+            await shield(session.close())
+        return
+
+    async with _read_session() as session:
+        await _set_org(session, org_id)
+        yield session
+
+
+def pool_stats() -> dict:
+    """Occupancy and checkout wait time of the connection pools of this process."""
+
+    stats = {"primary": engine.sync_engine.pool.stats()}
+    if replica_engine is not None:
+        stats["replica"] = replica_engine.sync_engine.pool.stats()
+
+    return stats
+
+
 async def create_database() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
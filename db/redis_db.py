@@ -1,8 +1,22 @@
 from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
 
 redis: Redis | None = None
 
+# Зарегистрированные Lua-скрипты: (id клиента, текст скрипта) -> скрипт
+_scripts: dict[tuple[int, str], AsyncScript] = {}
+
 
 # Функция понадобится при внедрении зависимостей
 async def get_redis() -> Redis:
     return redis
+
+
+def get_script(client: Redis, source: str) -> AsyncScript:
+    """Lua script bound to the client, executed with EVALSHA after the first load."""
+
+    script = _scripts.get((id(client), source))
+    if script is None or script.registered_client is not client:
+        script = _scripts[(id(client), source)] = client.register_script(source)
+
+    return script
@@ -0,0 +1,173 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+from uuid import UUID
+
+import orjson
+
+from core.settings import settings
+from db import redis_db
+from db.postgres import after_commit, in_write_transaction
+
+T = TypeVar("T")
+Loader = Callable[[], Awaitable[T | None]]
+
+# Marks a failed load for the requests waiting on it, they load the record themselves
+_LOAD_FAILED = object()
+
+# Time of the Redis server in microseconds, as a string: Redis keeps only 14 digits of a Lua number
+NOW_LUA = """
+local function now()
+    local time = redis.call('TIME')
+    return time[1] .. string.format('%06d', tonumber(time[2]))
+end
+"""
+
+# KEYS: record, invalidation mark; ARGV: mark TTL. Drops the record and marks when it happened.
+INVALIDATE_LUA = (
+    NOW_LUA
+    + """
+redis.call('DEL', KEYS[1])
+redis.call('SET', KEYS[2], now(), 'EX', ARGV[1])
+"""
+)
+
+# KEYS: record, email pointer, invalidation mark; ARGV: record, user id, TTL, load start time.
+# The record is not stored when the user was invalidated after the load started, returns 1 when stored.
+STORE_LUA = """
+local invalidated = redis.call('GET', KEYS[3])
+if invalidated and tonumber(invalidated) >= tonumber(ARGV[4]) then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+class UserCache:
+    """Read-through Redis cache of user records with their memberships.
+
+    The model provides `to_cache()` and `from_cache()`. Records are stored as orjson
+    under `user.<id>` for `ttl` seconds, `user_email.<email>` points to the id.
+    Concurrent misses of one key in a process are coalesced, so a burst of requests
+    for a cold user costs one database query. Records are invalidated
+    on every write of the user or its memberships and once more after the commit.
+    An invalidation leaves `user_invalidated.<id>` with its time, a load that started
+    before it does not store the record it read. Loaders should read the primary, a
+    lagging replica would refill the cache with the row that was just invalidated.
+    Redis is taken from db.redis_db, the cache is bypassed when it is not connected.
+    """
+
+    def __init__(self, ttl: int) -> None:
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._loading: dict[str, asyncio.Future] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and redis_db.redis is not None
+
+    @staticmethod
+    def id_key(user_id: UUID | str) -> str:
+        return f"user.{user_id}"
+
+    @staticmethod
+    def email_key(email: str) -> str:
+        return f"user_email.{email}"
+
+    @staticmethod
+    def invalidated_key(user_id: UUID | str) -> str:
+        return f"user_invalidated.{user_id}"
+
+    async def get_by_id(self, model: type[T], user_id: UUID | str, loader: Loader[T]) -> T | None:
+        if not self.enabled:
+            return await loader()
+
+        cached = await redis_db.redis.get(self.id_key(user_id))
+        if cached is not None:
+            self.hits += 1
+            return model.from_cache(orjson.loads(cached))
+
+        return await self._load(model, self.id_key(user_id), loader)
+
+    async def get_by_email(self, model: type[T], email: str, loader: Loader[T]) -> T | None:
+        if not self.enabled:
+            return await loader()
+
+        user_id = await redis_db.redis.get(self.email_key(email))
+        cached = await redis_db.redis.get(self.id_key(user_id)) if user_id is not None else None
+        if cached is not None:
+            data = orjson.loads(cached)
+            # The pointer outlives an email change, the record tells the truth
+            if data["email"] == email:
+                self.hits += 1
+                return model.from_cache(data)
+
+        return await self._load(model, self.email_key(email), loader)
+
+    async def _load(self, model: type[T], key: str, loader: Loader[T]) -> T | None:
+        """Load a missed record once per process, concurrent misses of `key` wait for it."""
+
+        loading = self._loading.get(key)
+        if loading is not None:
+            self.coalesced += 1
+            data = await asyncio.shield(loading)
+            if data is _LOAD_FAILED:
+                return await loader()
+
+            return model.from_cache(data) if data is not None else None
+
+        self.misses += 1
+        loading = self._loading[key] = asyncio.get_running_loop().create_future()
+        data = _LOAD_FAILED
+        try:
+            seconds, microseconds = await redis_db.redis.time()
+            started = seconds * 1_000_000 + microseconds
+            # The loaded instance itself goes to the caller, it may belong to the request's session
+            user = await loader()
+            data = user.to_cache() if user is not None else None
+            # Uncommitted writes of this request must not leak to other requests
+            if data is not None and not in_write_transaction():
+                await self._store(data, started)
+
+            return user
+
+        finally:
+            loading.set_result(data)
+            del self._loading[key]
+
+    async def _store(self, data: dict, started: int) -> None:
+        script = redis_db.get_script(redis_db.redis, STORE_LUA)
+        await script(
+            keys=[self.id_key(data["id"]), self.email_key(data["email"]), self.invalidated_key(data["id"])],
+            args=[orjson.dumps(data), str(data["id"]), self.ttl, started],
+        )
+
+    async def invalidate(self, user_id: UUID | str) -> None:
+        """Drop the record now and once more after the transaction is committed."""
+
+        if not self.enabled:
+            return
+
+        async def drop() -> None:
+            script = redis_db.get_script(redis_db.redis, INVALIDATE_LUA)
+            await script(keys=[self.id_key(user_id), self.invalidated_key(user_id)], args=[self.ttl])
+
+        await drop()
+        if in_write_transaction():
+            await after_commit(drop)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+user_cache = UserCache(ttl=settings.user_cache_ttl)
@@ -1,24 +1,35 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.responses import ORJSONResponse
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.instrumentation.redis import RedisInstrumentor
 from redis.asyncio import Redis
 
 from api import router as api_router
+from api.metrics import router as metrics_router
+from api.well_known import router as well_known_router
 from core.settings import settings
 from core.tracer import configure_tracer
 from db import redis_db
-from middleware import exception_traceback_middleware, required_request_id
+from db.postgres import unit_of_work
+from middleware import exception_traceback_middleware, password_hasher_busy_handler, required_request_id
+from models.history import history_writer
+from security.passwords import PasswordHasherBusyError, password_hasher
+from security.rate_limit import local_rate_limiter
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     redis_db.redis = Redis(host=settings.redis_host, port=settings.redis_port, db=0, decode_responses=True)
+    local_rate_limiter.start(redis_db.redis)
+    history_writer.start()
     yield
 
+    await history_writer.stop()
+    await local_rate_limiter.stop(redis_db.redis)
     await redis_db.redis.close()
+    password_hasher.shutdown()
 
 
 app = FastAPI(
@@ -44,4 +55,9 @@ else:
     # Make X-Request-Id header field mandatory
     app.middleware("http")(required_request_id)
 
-app.include_router(api_router, prefix="/api")
+app.add_exception_handler(PasswordHasherBusyError, password_hasher_busy_handler)
+app.include_router(api_router, prefix="/api", dependencies=[Depends(unit_of_work)])
+app.include_router(well_known_router, prefix="/.well-known", tags=["Well-known"])
+
+if settings.metrics_enabled:
+    app.include_router(metrics_router, prefix="/metrics", tags=["Metrics"], include_in_schema=False)
@@ -2,11 +2,15 @@
 import asyncio
 import os
 import subprocess
+from pathlib import Path
 
 import typer
 from sqlalchemy.exc import IntegrityError
 
+from core.settings import settings
 from models import User
+from models.history import maintain_history_partitions
+from security.keys import generate_private_key
 
 
 async def create_user(phone: str, email: str, password: str) -> User:
@@ -69,5 +73,35 @@ def createsuperuser():
     print(f'Super user "{super_admin.email}" created')
 
 
+@app.command()
+def generatekey(kid: str, algorithm: str = "EdDSA"):
+    """Add a signing key (RS256 or EdDSA) to AUTHJWT_KEYS_DIR."""
+    if not settings.authjwt_keys_dir:
+        print("AUTHJWT_KEYS_DIR is not set")
+        raise typer.Exit(1)
+
+    key_path = Path(settings.authjwt_keys_dir) / f"{kid}.pem"
+    if key_path.exists():
+        print(f'Key "{kid}" already exists')
+        raise typer.Exit(1)
+
+    key_path.parent.mkdir(parents=True, exist_ok=True)
+    key_path.write_bytes(generate_private_key(algorithm))
+    key_path.chmod(0o600)
+    print(f'Key "{kid}" created. Set AUTHJWT_SIGNING_KID={kid} to sign new tokens with it')
+
+
+@app.command()
+def maintainhistory(
+    ahead: int = settings.history_partitions_ahead,
+    retention: int = settings.history_retention_months,
+    drop: bool = False,
+):
+    """Create future history partitions, detach (or drop) the expired ones. Run daily."""
+    created, removed = asyncio.run(maintain_history_partitions(ahead=ahead, retention=retention, drop=drop))
+    print("Created:", ", ".join(created) or "-")
+    print("Dropped:" if drop else "Detached:", ", ".join(removed) or "-")
+
+
 if __name__ == "__main__":
     app()
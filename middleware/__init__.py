@@ -1,3 +1,3 @@
 # flake8: noqa
-from .exceptions import exception_traceback_middleware
+from .exceptions import exception_traceback_middleware, password_hasher_busy_handler
 from .request_id import required_request_id
@@ -2,10 +2,12 @@ import logging
 import traceback
 
 import httpx
+from fastapi import status
 from fastapi.requests import Request
 from fastapi.responses import JSONResponse
 
 from core import settings
+from security.passwords import PasswordHasherBusyError
 
 logger = logging.getLogger("api")
 
@@ -30,3 +32,14 @@ async def exception_traceback_middleware(request: Request, call_next):
         return JSONResponse(
             {"message": f"{exc.__class__.__name__}: {exc}", "traceback": traceback.format_exception(exc)}, 500
         )
+
+
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusyError) -> JSONResponse:
+    """Reject the request when the password hashing pool is saturated."""
+
+    logger.warning(f"{request.url.path}: {exc}")
+    return JSONResponse(
+        {"detail": "Service is busy, try again later"},
+        status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": "1"},
+    )
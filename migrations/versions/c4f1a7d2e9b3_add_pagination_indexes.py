@@ -0,0 +1,26 @@
+""" "add_pagination_indexes"
+
+Revision ID: c4f1a7d2e9b3
+Revises: 721e91193dc8
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c4f1a7d2e9b3"
+down_revision = "721e91193dc8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keyset pagination on (created_at, id), see IDMixin.paginate
+    op.create_index("ix_history_user_id_created_at_id", "history", ["user_id", "created_at", "id"], unique=False)
+    op.create_index("ix_users_created_at_id", "users", ["created_at", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_created_at_id", table_name="users")
+    op.drop_index("ix_history_user_id_created_at_id", table_name="history")
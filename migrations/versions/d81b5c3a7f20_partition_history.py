@@ -0,0 +1,91 @@
+""" "partition_history"
+
+Revision ID: d81b5c3a7f20
+Revises: c4f1a7d2e9b3
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d81b5c3a7f20"
+down_revision = "c4f1a7d2e9b3"
+branch_labels = None
+depends_on = None
+
+# Monthly partitions (UTC) from the oldest record up to 3 months ahead, see models.history.maintain_history_partitions
+CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    month timestamp := date_trunc(
+        'month', coalesce((SELECT min(created_at) FROM history_unpartitioned), now()) AT TIME ZONE 'UTC'
+    );
+BEGIN
+    WHILE month < date_trunc('month', now() AT TIME ZONE 'UTC') + interval '4 months' LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF history FOR VALUES FROM (%L) TO (%L)',
+            'history_y' || to_char(month, 'YYYY"m"MM'),
+            month::text || '+00',
+            (month + interval '1 month')::text || '+00'
+        );
+        month := month + interval '1 month';
+    END LOOP;
+END $$
+"""
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE history RENAME TO history_unpartitioned")
+    op.execute("ALTER TABLE history_unpartitioned RENAME CONSTRAINT history_pkey TO history_unpartitioned_pkey")
+    op.execute("ALTER TABLE history_unpartitioned DROP CONSTRAINT IF EXISTS history_id_key")
+    op.drop_index("ix_history_user_id_created_at_id", table_name="history_unpartitioned")
+
+    # The partition key has to be a part of the primary key
+    op.execute(
+        """
+        CREATE TABLE history (
+            user_agent VARCHAR(255) NOT NULL,
+            user_id UUID NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            id UUID NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.create_index("ix_history_user_id_created_at_id", "history", ["user_id", "created_at", "id"], unique=False)
+    # Records outside of the created partitions, moved out by the maintenance command
+    op.execute("CREATE TABLE history_default PARTITION OF history DEFAULT")
+    op.execute(CREATE_MONTHLY_PARTITIONS)
+
+    op.execute(
+        "INSERT INTO history (user_agent, user_id, id, created_at, updated_at) "
+        "SELECT user_agent, user_id, id, created_at, updated_at FROM history_unpartitioned"
+    )
+    op.execute("DROP TABLE history_unpartitioned")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE history RENAME TO history_partitioned")
+    op.execute("ALTER TABLE history_partitioned RENAME CONSTRAINT history_pkey TO history_partitioned_pkey")
+    op.drop_index("ix_history_user_id_created_at_id", table_name="history_partitioned")
+    op.execute(
+        """
+        CREATE TABLE history (
+            user_agent VARCHAR(255) NOT NULL,
+            user_id UUID NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            id UUID NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            CONSTRAINT history_pkey PRIMARY KEY (id),
+            CONSTRAINT history_id_key UNIQUE (id)
+        )
+        """
+    )
+    op.create_index("ix_history_user_id_created_at_id", "history", ["user_id", "created_at", "id"], unique=False)
+    op.execute(
+        "INSERT INTO history (user_agent, user_id, id, created_at, updated_at) "
+        "SELECT user_agent, user_id, id, created_at, updated_at FROM history_partitioned"
+    )
+    op.execute("DROP TABLE history_partitioned")
@@ -1,17 +1,35 @@
+import asyncio
+import logging
+import re
+import uuid
+from contextlib import suppress
+from datetime import UTC, date, datetime
 from typing import Self
 
-from sqlalchemy import Column, ForeignKey, String, select
+from sqlalchemy import Column, DateTime, ForeignKey, Index, String, insert, pool, select, text
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.exc import InterfaceError, OperationalError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import relationship
 
-from db.postgres import Base, get_session
+from core.settings import settings
+from db.postgres import Base, get_own_session, get_read_session
 
 from .mixins import CRUDMixin, IDMixin
 
+logger = logging.getLogger("api")
+
 
 class History(Base, IDMixin, CRUDMixin):
     __tablename__ = "history"
+    __table_args__ = (
+        Index("ix_history_user_id_created_at_id", "user_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
+    # Partitioned by month of created_at, so it is a part of the primary key
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, nullable=False)
+    created_at = Column(DateTime(timezone=True), primary_key=True, default=lambda: datetime.now(UTC), nullable=False)
     user_agent = Column(String(255), nullable=False)
     user_id = Column(UUID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     user = relationship("User", back_populates="history")
@@ -21,11 +39,245 @@ class History(Base, IDMixin, CRUDMixin):
         self.user_agent = user_agent
 
     @classmethod
-    async def get_by_user_id(cls, user_id: UUID, page: int = 1, page_size: int = 20) -> list[Self]:
-        async with get_session() as session:
-            request = select(cls).where(cls.user_id == user_id).limit(page_size).offset((page - 1) * page_size)
+    async def get_by_user_id(
+        cls,
+        user_id: UUID,
+        page: int = 1,
+        page_size: int = 20,
+        after: tuple[datetime, UUID] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> list[Self]:
+        """Login history of the user, newest first.
+
+        `since` and `until` bound created_at, only the partitions of these months are read.
+        """
+
+        request = select(cls).where(cls.user_id == user_id)
+        if since is not None:
+            request = request.where(cls.created_at >= since)
+        if until is not None:
+            request = request.where(cls.created_at < until)
+
+        async with get_read_session() as session:
+            request = cls.paginate(request, page=page, page_size=page_size, after=after, descending=True)
             result = await session.execute(request)
             return result.scalars().all()
 
     def __repr__(self) -> str:
         return f"<History element {self.user_agent}>"
+
+
+PARTITION_NAME = re.compile(r"^history_y(\d{4})m(\d{2})$")
+
+LIST_PARTITIONS = text(
+    "SELECT child.relname FROM pg_inherits "
+    "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+    "WHERE pg_inherits.inhparent = 'history'::regclass"
+)
+
+
+def month_start(day: date, shift: int = 0) -> datetime:
+    """First moment (UTC) of the month `shift` months away from the month of `day`."""
+
+    months = day.year * 12 + day.month - 1 + shift
+    return datetime(months // 12, months % 12 + 1, 1, tzinfo=UTC)
+
+
+def partition_name(month: datetime) -> str:
+    return f"history_y{month.year:04d}m{month.month:02d}"
+
+
+async def maintain_history_partitions(ahead: int, retention: int, drop: bool = False) -> tuple[list[str], list[str]]:
+    """Create monthly history partitions and remove the expired ones.
+
+    Partitions are created for the current and `ahead` next months, records that landed
+    in the default partition are moved into them. Partitions of months older than
+    `retention` months (0 - keep all) are detached and kept as separate tables, or
+    dropped with `drop`. Returns the names of the created and the removed partitions.
+    The DDL runs as the owner of the tables (POSTGRES_MIGRATE_* settings), like migrations do.
+    """
+
+    today = datetime.now(UTC).date()
+    created, removed = [], []
+    migrate_engine = create_async_engine(str(settings.migrate_pg_dsn), poolclass=pool.NullPool)
+    async with migrate_engine.begin() as connection:
+        existing = set((await connection.execute(LIST_PARTITIONS)).scalars())
+        for shift in range(ahead + 1):
+            start, end = month_start(today, shift), month_start(today, shift + 1)
+            name = partition_name(start)
+            if name in existing:
+                continue
+
+            # Attaching validates the default partition, it must not keep records of this month
+            await connection.execute(text(f"CREATE TABLE {name} (LIKE history INCLUDING DEFAULTS)"))
+            await connection.execute(
+                text(
+                    "WITH moved AS (DELETE FROM history_default WHERE created_at >= :start AND created_at < :end "
+                    f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+                ),
+                {"start": start, "end": end},
+            )
+            await connection.execute(
+                text(
+                    f"ALTER TABLE history ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+            )
+            created.append(name)
+
+        oldest = month_start(today, -retention)
+        for name in sorted(existing):
+            match = PARTITION_NAME.match(name)
+            if retention <= 0 or match is None or datetime(int(match[1]), int(match[2]), 1, tzinfo=UTC) >= oldest:
+                continue
+
+            await connection.execute(text(f"ALTER TABLE history DETACH PARTITION {name}"))
+            if drop:
+                await connection.execute(text(f"DROP TABLE {name}"))
+            removed.append(name)
+
+    await migrate_engine.dispose()
+    return created, removed
+
+
+# Errors of the connection rather than of the records, the batch is retried by the next flush
+TRANSIENT_ERRORS = (OSError, OperationalError, InterfaceError)
+
+
+class HistoryWriter:
+    """Write-behind buffer of login history records.
+
+    Records are kept in worker memory and inserted by one multi-row INSERT when
+    `batch_size` of them are collected or every `flush_interval` seconds, off the
+    request path. At most `max_pending` records are kept: a request finding the buffer
+    full flushes it itself (backpressure), records that still do not fit are dropped.
+    Batches failed by the connection are retried, records the database rejects are dropped.
+    Batches are inserted on their own connection, not in the transaction of the request
+    that flushes. The buffer is flushed on shutdown, records of a killed worker are lost.
+    """
+
+    def __init__(self, flush_interval: float, batch_size: int, max_pending: int) -> None:
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.written = 0
+        self.dropped = 0
+        self.backpressured = 0
+        self.failed_flushes = 0
+        self.rejected = 0
+        self._pending: list[dict] = []
+        self._lock = asyncio.Lock()
+        self._batch_ready = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_interval > 0 and self.batch_size > 0
+
+    async def record(self, user_id: UUID, user_agent: str) -> None:
+        """Record a login, saved right away when the writer is not running."""
+
+        if self._task is None:
+            await History(user_id=user_id, user_agent=user_agent).save()
+            return
+
+        if len(self._pending) >= self.max_pending:
+            self.backpressured += 1
+            await self.flush()
+
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+
+        now = datetime.now(UTC)
+        self._pending.append(
+            {"id": uuid.uuid4(), "user_id": user_id, "user_agent": user_agent, "created_at": now, "updated_at": now}
+        )
+        if len(self._pending) >= self.batch_size:
+            self._batch_ready.set()
+
+    @staticmethod
+    async def _insert(rows: list[dict]) -> None:
+        # Not the session of the request that flushes, the records belong to many requests
+        async with get_own_session() as session:
+            await session.execute(insert(History), rows)
+
+    def _keep(self, rows: list[dict], err: Exception) -> None:
+        """Keep the rows for the next flush while there is room for them."""
+
+        self.failed_flushes += 1
+        room = max(0, self.max_pending - len(self._pending))
+        self.dropped += max(0, len(rows) - room)
+        self._pending[:0] = rows[:room]
+        logger.warning(f"History flush failed: {err}, history writer stats: {self.stats()}")
+
+    async def flush(self) -> None:
+        async with self._lock:
+            while self._pending:
+                batch, self._pending = self._pending[: self.batch_size], self._pending[self.batch_size :]
+                try:
+                    await self._insert(batch)
+
+                except TRANSIENT_ERRORS as err:
+                    self._keep(batch, err)
+                    return
+
+                except SQLAlchemyError as err:
+                    # Rejected rows (a user deleted after the login) would stall the buffer, they are dropped one by one
+                    logger.warning(f"History batch rejected: {err}, inserting its records one by one")
+                    for index, row in enumerate(batch):
+                        try:
+                            await self._insert([row])
+                        except TRANSIENT_ERRORS as err:
+                            self._keep(batch[index:], err)
+                            return
+                        except SQLAlchemyError:
+                            self.rejected += 1
+                            continue
+
+                        self.written += 1
+                    continue
+
+                self.written += len(batch)
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+
+            self._batch_ready.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Let the running flush finish instead of cancelling it, then flush what is left."""
+
+        if self._task is not None:
+            self._stopping.set()
+            self._batch_ready.set()
+            await self._task
+            self._task = None
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "written": self.written,
+            "dropped": self.dropped,
+            "backpressured": self.backpressured,
+            "failed_flushes": self.failed_flushes,
+            "rejected": self.rejected,
+        }
+
+
+history_writer = HistoryWriter(
+    flush_interval=settings.history_flush_ms / 1000,
+    batch_size=settings.history_batch_size,
+    max_pending=settings.history_max_pending,
+)
@@ -1,16 +1,18 @@
 from typing import Self
 
-from sqlalchemy import Boolean, Column, Enum, ForeignKey, UniqueConstraint, select
+from sqlalchemy import Boolean, Column, Enum, ForeignKey, UniqueConstraint, func, select
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
-from constants import MembershipRole
-from db.postgres import Base, get_session
+from constants import ALL_ROLES, ROLE_BITS, ROLES_AT_LEAST, MembershipRole
+from db.membership_snapshot import membership_snapshot
+from db.postgres import Base, get_read_session
+from db.user_cache import user_cache
 
-from .mixins import CRUDMixin, IDMixin
+from .mixins import CRUDMixin, IDMixin, SerializeMixin
 
 
-class Membership(Base, IDMixin, CRUDMixin):
+class Membership(Base, IDMixin, CRUDMixin, SerializeMixin):
     __tablename__ = "memberships"
     __table_args__ = (UniqueConstraint("org_id", "user_id", name="unique_org_user_membership"),)
 
@@ -29,10 +31,22 @@ class Membership(Base, IDMixin, CRUDMixin):
         self.role = role
         self.is_primary = is_primary
 
+    async def save(self, *args, **kwargs) -> Self:
+        instance = await super().save(*args, **kwargs)
+        await user_cache.invalidate(self.user_id)
+        await membership_snapshot.bump(self.user_id)
+        return instance
+
+    async def delete(self, *args, **kwargs) -> Self:
+        instance = await super().delete(*args, **kwargs)
+        await user_cache.invalidate(self.user_id)
+        await membership_snapshot.bump(self.user_id)
+        return instance
+
     @classmethod
     async def get_user_memberships(cls, user_id: UUID) -> list[Self]:
         """Get all memberships for a user"""
-        async with get_session() as session:
+        async with get_read_session() as session:
             request = select(cls).where(cls.user_id == user_id)
             result = await session.execute(request)
             return result.scalars().all()
@@ -40,15 +54,23 @@ class Membership(Base, IDMixin, CRUDMixin):
     @classmethod
     async def get_org_memberships(cls, org_id: UUID) -> list[Self]:
         """Get all memberships for an organization"""
-        async with get_session() as session:
+        async with get_read_session() as session:
             request = select(cls).where(cls.org_id == org_id)
             result = await session.execute(request)
             return result.scalars().all()
 
+    @classmethod
+    async def count_org_memberships(cls, org_id: UUID) -> int:
+        """Count memberships (occupied seats) of an organization"""
+        async with get_read_session() as session:
+            request = select(func.count()).select_from(cls).where(cls.org_id == org_id)
+            result = await session.execute(request)
+            return result.scalar_one()
+
     @classmethod
     async def get_membership(cls, org_id: UUID, user_id: UUID) -> Self:
         """Get specific membership for user in organization"""
-        async with get_session() as session:
+        async with get_read_session() as session:
             request = select(cls).where(cls.org_id == org_id, cls.user_id == user_id)
             result = await session.execute(request)
             return result.scalars().first()
@@ -56,25 +78,15 @@ class Membership(Base, IDMixin, CRUDMixin):
     @classmethod
     async def get_user_primary_membership(cls, user_id: UUID) -> Self:
         """Get user's primary membership"""
-        async with get_session() as session:
+        async with get_read_session() as session:
             request = select(cls).where(cls.user_id == user_id, cls.is_primary is True)
             result = await session.execute(request)
             return result.scalars().first()
 
     def has_role(self, required_role: str) -> bool:
         """Check if membership has required role or higher"""
-        role_hierarchy = {
-            MembershipRole.VIEWER: 1,
-            MembershipRole.COURIER: 2,
-            MembershipRole.DISPATCHER: 3,
-            MembershipRole.ADMIN: 4,
-            MembershipRole.OWNER: 5,
-        }
-
-        current_level = role_hierarchy.get(self.role, 0)
-        required_level = role_hierarchy.get(required_role, 0)
-
-        return current_level >= required_level
+
+        return bool(ROLE_BITS.get(self.role, 0) & ROLES_AT_LEAST.get(required_role, ALL_ROLES))
 
     def __repr__(self) -> str:
         return f"<Membership user_id={self.user_id} org_id={self.org_id} role={self.role}>"
@@ -2,11 +2,12 @@ import uuid
 from datetime import UTC, datetime
 from typing import Self
 
-from sqlalchemy import Column, DateTime, select
+from sqlalchemy import Column, DateTime, Select, select, tuple_
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import make_transient_to_detached
 
 from constants import DEFAULT_ORG_ID
-from db.postgres import get_session
+from db.postgres import get_read_session, get_session
 
 
 class CRUDMixin:
@@ -45,9 +46,11 @@ class CRUDMixin:
         return self
 
     @classmethod
-    async def get_all(cls, page: int = 1, page_size: int = 20) -> list[Self]:
-        async with get_session() as session:
-            request = select(cls).limit(page_size).offset((page - 1) * page_size)
+    async def get_all(
+        cls, page: int = 1, page_size: int = 20, after: tuple[datetime, uuid.UUID] | None = None
+    ) -> list[Self]:
+        async with get_read_session() as session:
+            request = cls.paginate(select(cls), page=page, page_size=page_size, after=after)
             result = await session.execute(request)
             return result.scalars().all()
 
@@ -68,9 +71,70 @@ class IDMixin:
         nullable=False,
     )
 
+    @classmethod
+    def paginate(
+        cls,
+        request: Select,
+        page: int = 1,
+        page_size: int = 20,
+        after: tuple[datetime, uuid.UUID] | None = None,
+        descending: bool = False,
+    ) -> Select:
+        """Order the request by (created_at, id) and select one page of it.
+
+        With `after`, the (created_at, id) of the last row of the previous page, the page
+        is read by keyset from an index on these columns, otherwise by `page` offset.
+        """
+
+        key = tuple_(cls.created_at, cls.id)
+        if descending:
+            request = request.order_by(cls.created_at.desc(), cls.id.desc())
+        else:
+            request = request.order_by(cls.created_at, cls.id)
+
+        if after is None:
+            return request.limit(page_size).offset((page - 1) * page_size)
+
+        # The plain bound on created_at lets Postgres prune partitions, the row comparison cannot
+        if descending:
+            request = request.where(cls.created_at <= after[0], key < tuple_(*after))
+        else:
+            request = request.where(cls.created_at >= after[0], key > tuple_(*after))
+
+        return request.limit(page_size)
+
     @classmethod
     async def get_by_id(cls, id_: UUID) -> Self:
-        async with get_session() as session:
+        async with get_read_session() as session:
             request = select(cls).where(cls.id == id_)
             result = await session.execute(request)
             return result.scalars().first()
+
+
+class SerializeMixin:
+    """Conversion of a row to a plain dict and back, used to cache rows outside the database."""
+
+    def to_dict(self) -> dict:
+        return {column.key: getattr(self, column.key) for column in self.__table__.columns}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Self:
+        """Detached instance, as if it was loaded by a session that is closed already.
+
+        Values serialized to JSON (UUID, datetime, enums) are converted back by column type.
+        """
+
+        instance = cls.__mapper__.class_manager.new_instance()
+        for column in cls.__table__.columns:
+            value = data.get(column.key)
+            python_type = column.type.python_type
+            if value is not None and not isinstance(value, python_type):
+                value = datetime.fromisoformat(value) if python_type is datetime else python_type(value)
+
+            setattr(instance, column.key, value)
+
+        return instance
+
+    def detach(self) -> Self:
+        make_transient_to_detached(self)
+        return self
@@ -5,8 +5,11 @@ from sqlalchemy import Column, Enum, String, select
 from sqlalchemy.orm import relationship
 
 from constants import OrgStatus, Plan
-from db.postgres import Base, get_session
+from db.membership_snapshot import membership_snapshot
+from db.postgres import Base, get_read_session
+from db.user_cache import user_cache
 
+from .membership import Membership
 from .mixins import CRUDMixin, IDMixin
 
 
@@ -32,9 +35,19 @@ class Organization(Base, IDMixin, CRUDMixin):
         self.plan = plan
         self.status = status
 
+    async def delete(self, *args, **kwargs) -> Self:
+        """Delete with the memberships, the cached records and snapshots of the members are outdated."""
+
+        members = {membership.user_id for membership in await Membership.get_org_memberships(self.id)}
+        instance = await super().delete(*args, **kwargs)
+        for user_id in members:
+            await user_cache.invalidate(user_id)
+            await membership_snapshot.bump(user_id)
+        return instance
+
     @classmethod
     async def get_by_id(cls, id_: UUID, current_org_id: str) -> Self:
-        async with get_session(current_org_id) as session:
+        async with get_read_session(current_org_id) as session:
             request = select(cls).where(cls.id == id_)
             result = await session.execute(request)
             return result.scalars().first()
@@ -45,14 +58,14 @@ class Organization(Base, IDMixin, CRUDMixin):
         slug: str,
         org_id: UUID,
     ) -> Self:
-        async with get_session(org_id) as session:
+        async with get_read_session(org_id) as session:
             request = select(cls).where(cls.slug == slug)
             result = await session.execute(request)
             return result.scalars().first()
 
     @classmethod
     async def get_active_organizations(cls, org_id: UUID) -> list[Self]:
-        async with get_session(org_id) as session:
+        async with get_read_session(org_id) as session:
             request = select(cls).where(cls.status == "active")
             result = await session.execute(request)
             return result.scalars().all()
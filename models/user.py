@@ -1,30 +1,24 @@
+from datetime import datetime
+from functools import partial
 from typing import Self
 
-from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError
-from argon2.low_level import Type as Argon2Type
-from sqlalchemy import Column, Enum, ForeignKey, String, select
+from sqlalchemy import Column, Enum, ForeignKey, Index, Select, String, select
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import joinedload, relationship
+from sqlalchemy.orm import aliased, joinedload, load_only, relationship
 
-from constants import UserStatus
-from db.postgres import Base, get_session
+from constants import MembershipRole, UserStatus
+from db.membership_snapshot import membership_snapshot
+from db.postgres import Base, get_read_session, get_session
+from db.user_cache import user_cache
+from security.passwords import password_hasher
 
 from .membership import Membership
-from .mixins import CRUDMixin, IDMixin
+from .mixins import CRUDMixin, IDMixin, SerializeMixin
 
-# Initialize Argon2 password hasher with secure defaults
-ph = PasswordHasher(
-    time_cost=2,
-    memory_cost=65536,  # 64 MiB
-    parallelism=1,
-    hash_len=32,
-    type=Argon2Type.ID,
-)
 
-
-class User(Base, IDMixin, CRUDMixin):
+class User(Base, IDMixin, CRUDMixin, SerializeMixin):
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
 
     login = Column(String(255), unique=True)
     email = Column(String(255), unique=True, nullable=False)
@@ -45,59 +39,188 @@ class User(Base, IDMixin, CRUDMixin):
         email: str,
         first_name: str,
         last_name: str,
-        password: str | None = None,
+        password_hash: str | None = None,
     ) -> None:
         self.phone = phone
         self.email = email
-        self.password = ph.hash(password) if password is not None else None
+        self.password = password_hash
         self.first_name = first_name
         self.last_name = last_name
 
-    def check_password(self, password: str) -> bool:
+    @classmethod
+    async def build(cls, password: str | None = None, **kwargs) -> Self:
+        """Create an unsaved user, hashing the password in the worker pool."""
+
+        password_hash = await password_hasher.hash(password) if password is not None else None
+        return cls(**kwargs, password_hash=password_hash)
+
+    @classmethod
+    async def create(cls, commit=True, **kwargs) -> Self:
+        instance = await cls.build(**kwargs)
+        return await instance.save(commit=commit)
+
+    async def check_password(self, password: str) -> bool:
         if self.password is None:
             return False
-        try:
-            ph.verify(self.password, password)
-            return True
 
-        except VerifyMismatchError:
-            return False
+        return await password_hasher.verify(self.password, password)
 
     async def change_password(self, password: str, commit: bool = True) -> bool:
-        self.password = ph.hash(password)
+        self.password = await password_hasher.hash(password)
         return await self.save(commit=commit)
 
+    async def save(self, *args, **kwargs) -> Self:
+        instance = await super().save(*args, **kwargs)
+        await user_cache.invalidate(self.id)
+        await membership_snapshot.bump(self.id)
+        return instance
+
+    async def delete(self, *args, **kwargs) -> Self:
+        instance = await super().delete(*args, **kwargs)
+        await user_cache.invalidate(self.id)
+        await membership_snapshot.bump(self.id)
+        return instance
+
+    def to_cache(self) -> dict:
+        """user_cache record, the password hash is not stored, only get_for_login reads it."""
+
+        data = self.to_dict()
+        del data["password"]
+        return {**data, "memberships": [membership.to_dict() for membership in self.memberships]}
+
     @classmethod
-    async def get_by_login(cls, username: str) -> Self:
+    def from_cache(cls, data: dict) -> Self:
+        """Detached user with memberships from a user_cache record."""
+
+        user = cls.from_dict(data)
+        user.memberships = [Membership.from_dict(membership) for membership in data["memberships"]]
+        for membership in user.memberships:
+            membership.detach()
+
+        return user.detach()
+
+    @classmethod
+    async def _load_with_memberships(cls, *criteria) -> Self | None:
+        """Loader of user_cache, reads the primary so a fill does not bring back a row being replaced."""
+
         async with get_session() as session:
+            request = select(cls).options(joinedload(cls.memberships)).where(*criteria)
+            result = await session.execute(request)
+            return result.scalars().unique().first()
+
+    @classmethod
+    async def get_by_login(cls, username: str) -> Self:
+        async with get_read_session() as session:
             request = select(cls).where(cls.login == username)
             result = await session.execute(request)
             return result.scalars().unique().first()
 
     @classmethod
     async def get_by_email(cls, email: str) -> Self:
-        async with get_session() as session:
-            request = select(cls).options(joinedload(cls.memberships)).where(cls.email == email)
-            result = await session.execute(request)
+        return await user_cache.get_by_email(cls, email, partial(cls._load_with_memberships, cls.email == email))
+
+    @classmethod
+    async def get_for_login(cls, email: str) -> Self | None:
+        """User with the columns login needs and its memberships, in one statement.
+
+        Timestamps are not loaded, the instance serves the password check and the claims only.
+        """
+
+        async with get_read_session() as session:
+            result = await session.execute(cls.login_request(email))
             return result.scalars().unique().first()
 
     @classmethod
-    async def get_all(cls, page: int = 1, page_size: int = 20) -> list[Self]:
-        async with get_session() as session:
-            request = select(cls).options(joinedload(cls.memberships)).limit(page_size).offset((page - 1) * page_size)
+    def login_request(cls, email: str) -> Select:
+        """Statement of get_for_login."""
+
+        return (
+            select(cls)
+            .options(
+                load_only(
+                    cls.id, cls.password, cls.status, cls.email, cls.phone, cls.first_name, cls.last_name, cls.login
+                ),
+                joinedload(cls.memberships).load_only(
+                    Membership.id, Membership.org_id, Membership.user_id, Membership.role, Membership.is_primary
+                ),
+            )
+            .where(cls.email == email)
+        )
+
+    @classmethod
+    async def get_statuses(cls, ids: list[UUID]) -> dict[str, UserStatus]:
+        """Statuses of the existing users among `ids` by user id, in one query."""
+
+        async with get_read_session() as session:
+            result = await session.execute(select(cls.id, cls.status).where(cls.id.in_(ids)))
+            return {str(user_id): status for user_id, status in result}
+
+    @classmethod
+    async def get_all(
+        cls, page: int = 1, page_size: int = 20, after: tuple[datetime, UUID] | None = None
+    ) -> list[Self]:
+        async with get_read_session() as session:
+            request = cls.paginate(
+                select(cls).options(joinedload(cls.memberships)), page=page, page_size=page_size, after=after
+            )
             result = await session.execute(request)
             return result.scalars().unique().all()
 
     @classmethod
-    async def get_by_id(cls, id_: UUID, without_memberships: bool = False) -> Self:
-        async with get_session() as session:
-            request = select(cls)
-            if not without_memberships:
-                request = request.options(joinedload(cls.memberships))
+    def org_users_request(
+        cls,
+        org_id: UUID,
+        page: int = 1,
+        page_size: int = 20,
+        after: tuple[datetime, UUID] | None = None,
+        role: MembershipRole | None = None,
+        status: UserStatus | None = None,
+    ) -> Select:
+        """Statement of get_org_users: the filtering join of the organization and the joined memberships."""
+
+        org_membership = aliased(Membership)
+        request = (
+            select(cls)
+            .join(org_membership, org_membership.user_id == cls.id)
+            .where(org_membership.org_id == org_id)
+            .options(joinedload(cls.memberships))
+        )
+        if role is not None:
+            request = request.where(org_membership.role == role)
+        if status is not None:
+            request = request.where(cls.status == status)
+
+        return cls.paginate(request, page=page, page_size=page_size, after=after)
 
-            request = request.where(cls.id == id_)
+    @classmethod
+    async def get_org_users(
+        cls,
+        org_id: UUID,
+        page: int = 1,
+        page_size: int = 20,
+        after: tuple[datetime, UUID] | None = None,
+        role: MembershipRole | None = None,
+        status: UserStatus | None = None,
+    ) -> list[Self]:
+        """Users of the organization with all their memberships in one query, see IDMixin.paginate."""
+
+        request = cls.org_users_request(org_id, page=page, page_size=page_size, after=after, role=role, status=status)
+        async with get_read_session(org_id) as session:
             result = await session.execute(request)
-            return result.scalars().unique().first()
+            return result.scalars().unique().all()
+
+    @classmethod
+    async def get_by_id(cls, id_: UUID, without_memberships: bool = False, without_cache: bool = False) -> Self:
+        if without_cache:
+            return await cls._load_with_memberships(cls.id == id_)
+
+        if not without_memberships:
+            return await user_cache.get_by_id(cls, id_, partial(cls._load_with_memberships, cls.id == id_))
+
+        async with get_read_session() as session:
+            request = select(cls).where(cls.id == id_)
+            result = await session.execute(request)
+            return result.scalars().first()
 
     async def get_memberships(self) -> list:
         """Get all memberships for this user"""
@@ -123,7 +246,7 @@ class Social(Base, IDMixin, CRUDMixin):
 
     @classmethod
     async def get_by_social_id(cls, social_id: str) -> Self:
-        async with get_session() as session:
+        async with get_read_session() as session:
             request = select(cls).where(cls.social_id == social_id)
             result = await session.execute(request)
             return result.scalars().first()
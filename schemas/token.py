@@ -1,10 +1,10 @@
 from hashlib import md5
 from typing import Self
 
-from async_fastapi_jwt_auth import AuthJWT
-
 from core.settings import settings
 from db.redis_db import get_redis
+from security.jwt_auth import AuthJWT
+from security.keys import get_key_ring
 
 from .base import Model
 from .user import UserResponse
@@ -22,14 +22,28 @@ class Tokens(Model):
         user_claims = user.to_user_claims(current_org_id=org_id)
         user_agent_hash = md5(user_agent.encode()).hexdigest()
 
+        # With a key ring tokens are signed asymmetrically and carry the key id
+        algorithm, headers = None, None
+        key_ring = get_key_ring()
+        if key_ring is not None:
+            algorithm, headers = key_ring.current.algorithm, {"kid": key_ring.current.kid}
+
         access_key = f"access.{user_claims['user_id']}.{user_agent_hash}"
         access_token = await authorize.create_access_token(
-            subject=access_key, user_claims=user_claims, expires_time=settings.authjwt_access_token_expires
+            subject=access_key,
+            user_claims=user_claims,
+            expires_time=settings.authjwt_access_token_expires,
+            algorithm=algorithm,
+            headers=headers,
         )
 
         refresh_key = f"refresh.{user_claims['user_id']}.{user_agent_hash}"
         refresh_token = await authorize.create_refresh_token(
-            subject=refresh_key, user_claims=user_claims, expires_time=settings.authjwt_refresh_token_expires
+            subject=refresh_key,
+            user_claims=user_claims,
+            expires_time=settings.authjwt_refresh_token_expires,
+            algorithm=algorithm,
+            headers=headers,
         )
 
         redis = await get_redis()
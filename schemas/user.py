@@ -82,7 +82,7 @@ class UserResponse(UserCreated):
         org_roles = {}
         for membership in self.memberships:
             if str(current_org_id) == str(membership.org_id):
-                org = membership.org_id
+                org = str(membership.org_id)
                 current_membership = membership
 
             roles = org_roles.setdefault(str(membership.org_id), [])
@@ -0,0 +1,47 @@
+from uuid import UUID
+
+from pydantic import Field
+
+from core.settings import settings
+
+from .base import Model
+
+
+class TokenCheck(Model):
+    token: str
+    org_id: UUID | None = None
+
+
+class TokenBatch(Model):
+    """Access tokens to verify, each optionally in the context of an organization."""
+
+    tokens: list[TokenCheck] = Field(min_length=1, max_length=settings.verify_batch_size)
+
+
+class TokenVerification(Model):
+    """Claims of a valid token or the reason it is rejected."""
+
+    claims: dict | None = None
+    error: str | None = None
+
+
+class IntrospectionRequest(Model):
+    """RFC 7662 introspection request, only access tokens are issued to resource servers."""
+
+    token: str
+    token_type_hint: str | None = None
+
+
+class PermissionCheck(Model):
+    scope: str
+    org_id: UUID
+
+
+class PermissionBatch(Model):
+    """Scopes to check for the token owner, each in an organization."""
+
+    checks: list[PermissionCheck] = Field(min_length=1, max_length=settings.verify_batch_size)
+
+
+class PermissionResult(PermissionCheck):
+    allowed: bool
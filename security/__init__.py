@@ -9,6 +9,8 @@ from .auth import (
     owner_required,
     refresh_protected,
 )
+from .gateway import gateway_client
+from .rate_limit import GATEWAY_POLICY, LOGIN_POLICY, VERIFY_POLICY, RateLimit
 
 # Legacy protection dependencies
 TOKEN_PROTECTED = [Depends(full_protected)]
@@ -18,3 +20,10 @@ OWNER_REQUIRED = [Depends(owner_required)]
 ADMIN_REQUIRED = [Depends(admin_required)]
 DISPATCHER_REQUIRED = [Depends(dispatcher_required)]
 COURIER_REQUIRED = [Depends(courier_required)]
+
+# Rate limit policies
+LOGIN_RATE_LIMITED = [Depends(RateLimit(LOGIN_POLICY))]
+VERIFY_RATE_LIMITED = [Depends(RateLimit(VERIFY_POLICY))]
+
+# Verify endpoints for gateways, the IP limit is checked before the client credentials
+GATEWAY_PROTECTED = [Depends(RateLimit(GATEWAY_POLICY)), Depends(gateway_client)]
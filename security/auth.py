@@ -1,40 +1,105 @@
-from async_fastapi_jwt_auth import AuthJWT
 from async_fastapi_jwt_auth.exceptions import AuthJWTException
-from fastapi import Depends, Header
+from fastapi import Depends, Header, Request
 from fastapi.exceptions import HTTPException
+from fastapi.routing import APIRoute
 from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.security.http import HTTPBearer
 from redis.asyncio import Redis
 from starlette import status
 
+from constants import ROLE_BITS, ROLES_AT_LEAST, MembershipRole, role_mask
 from core.settings import settings
 from db.redis_db import get_redis
-from security.rate_limit import is_rate_limit_exceeded
+from security.auth_gate import GateStatus, check_auth_gate
+from security.jwt_auth import AuthJWT
+from security.quotas import org_quota_policy
+from security.rate_limit import route_policy, too_many_requests
+from security.revocation import is_token_revoked
+from security.scopes import SCOPE_BITS, UNKNOWN_SCOPE, org_scope_mask, scope_mask
 
 RULE_PROTECTED_TEXT = "No access to this resource. Please contact your administrator if you believe this is an error."
 
 
 async def full_protected(
+    request: Request,
     authorize: AuthJWT = Depends(),
     redis: Redis = Depends(get_redis),
-    credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer(auto_error=False)),
 ) -> AuthJWT:
+    await authenticate(request, authorize, redis, org_quota=is_org_route(request))
+    return authorize
+
+
+async def authenticate(request: Request, authorize: AuthJWT, redis: Redis, org_quota: bool) -> None:
+    """Verify the access token and run the auth gate, with the organization quota when `org_quota` is set."""
+
     try:
         await authorize.jwt_required()
 
     except AuthJWTException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
 
-    current_access_token = credentials.credentials
-    if await is_rate_limit_exceeded(current_access_token):
-        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many requests")
-
-    access_key = await authorize.get_jwt_subject()
-    blocked_access_tokens = await redis.smembers(access_key)
-    if blocked_access_tokens and current_access_token in blocked_access_tokens:
+    user_claims = await authorize.get_raw_jwt()
+    policy = route_policy(request)
+    org_id = request_org(user_claims, request.headers.get("X-Org-ID")) if org_quota else None
+    org_policy = await org_quota_policy(org_id) if org_id is not None else None
+    gate_status = await check_auth_gate(redis, user_claims, policy, org_id, org_policy)
+    if gate_status == GateStatus.REVOKED:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Signature has blocked")
 
-    return authorize
+    if gate_status == GateStatus.SESSION_EXPIRED:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session has expired")
+
+    if gate_status == GateStatus.RATE_LIMITED:
+        raise too_many_requests(policy)
+
+    if gate_status == GateStatus.ORG_QUOTA_EXCEEDED:
+        error = too_many_requests(org_policy)
+        error.detail = "Organization request quota exceeded"
+        raise error
+
+
+def request_org(user_claims: dict, x_org_id: str | None) -> str | None:
+    """Organization of the request: X-Org-ID, the token organization or the first one of the user.
+
+    None when there is no organization or X-Org-ID names one the user is not a member of.
+    """
+
+    if x_org_id:
+        return x_org_id if x_org_id in user_claims["org_roles"] else None
+
+    if user_claims["org"] is not None:
+        return user_claims["org"]
+
+    return next(iter(user_claims["org_roles"]), None)
+
+
+def _depends_on_multitenancy(route: APIRoute) -> bool:
+    dependants = list(route.dependant.dependencies)
+    while dependants:
+        dependant = dependants.pop()
+        if dependant.call is multitenancy_protected:
+            return True
+        dependants.extend(dependant.dependencies)
+
+    return False
+
+
+# Routes are not hashable, they live as long as the app, so they are cached by id
+_org_routes: dict[int, bool] = {}
+
+
+def is_org_route(request: Request) -> bool:
+    """Whether the matched route works in an organization context, its requests count toward the org quota."""
+
+    route = request.scope.get("route")
+    if not isinstance(route, APIRoute):
+        return False
+
+    org_route = _org_routes.get(id(route))
+    if org_route is None:
+        org_route = _org_routes[id(route)] = _depends_on_multitenancy(route)
+
+    return org_route
 
 
 async def refresh_protected(
@@ -50,7 +115,8 @@ async def refresh_protected(
     current_refresh_token = credentials.credentials
     refresh_key = await authorize.get_jwt_subject()
     active_refresh_token = await redis.get(name=refresh_key)
-    if current_refresh_token == active_refresh_token:
+    user_claims = await authorize.get_raw_jwt()
+    if current_refresh_token == active_refresh_token and not await is_token_revoked(redis, user_claims):
         return authorize
 
     raise HTTPException(
@@ -61,32 +127,23 @@ async def refresh_protected(
 
 async def multitenancy_protected(
     authorize: AuthJWT = Depends(full_protected),
-    redis: Redis = Depends(get_redis),
-    x_org_id: str = Header(default=None, alias="X-Org-ID"),
-    credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer(auto_error=False)),
+    x_org_id: str | None = Header(default=None, alias="X-Org-ID"),
+    credentials: HTTPAuthorizationCredentials | None = Depends(HTTPBearer(auto_error=False)),
 ) -> tuple[AuthJWT, dict, str]:
     """
     Multitenancy-aware protection that validates organization access and sets DB context
     Returns: (authorize, user, org_id)
+    The organization quota is taken by full_protected in the same auth gate call.
     """
-    # Get user claims and validate multitenancy context
     user_claims = await authorize.get_raw_jwt()
 
-    if x_org_id:
-        if x_org_id not in user_claims["org_roles"]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN, detail=f"User does not have access to organization {x_org_id}"
-            )
-        target_org_id = x_org_id
-
-    elif user_claims["org"] is not None:
-        target_org_id = user_claims["org"]
-
-    elif user_claims["org_roles"]:
-        # If no X-Org-ID header, use the first available organization
-        target_org_id = next(iter(user_claims["org_roles"]))
+    if x_org_id and x_org_id not in user_claims["org_roles"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=f"User does not have access to organization {x_org_id}"
+        )
 
-    else:
+    target_org_id = request_org(user_claims, x_org_id)
+    if target_org_id is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No organization context available")
 
     return authorize, user_claims, target_org_id
@@ -99,10 +156,16 @@ async def role_required(
     Dependency factory for role-based authorization
     Usage: Depends(role_required(["admin", "owner"]))
     """
-    authorize, user_claims, org_id = auth_data
+    return _check_roles(auth_data, role_mask(required_roles))
+
 
+def _check_roles(auth_data: tuple[AuthJWT, dict, str], required: int) -> tuple[AuthJWT, dict, str]:
+    """Pass when the user has any of the `required` roles (a role mask) in the organization."""
+
+    authorize, user_claims, org_id = auth_data
     user_roles = user_claims["org_roles"].get(org_id, [])
-    if not any(role in user_roles for role in required_roles):
+    if not role_mask(user_roles) & required:
+        required_roles = [role.value for role, bit in ROLE_BITS.items() if bit & required]
         detail = (
             f"Required roles: {required_roles}. User roles: {user_roles}" if settings.debug else RULE_PROTECTED_TEXT
         )
@@ -112,53 +175,25 @@ async def role_required(
 
 
 async def owner_required(auth_data: tuple[AuthJWT, dict, str] = Depends(multitenancy_protected)):
-    authorize, user_claims, org_id = auth_data
-    user_roles = user_claims["org_roles"].get(org_id, [])
-    if not any(role in user_roles for role in ["owner"]):
-        detail = f"Required roles: {["owner"]}. User roles: {user_roles}" if settings.debug else RULE_PROTECTED_TEXT
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
-
-    return authorize, user_claims, org_id
+    return _check_roles(auth_data, ROLES_AT_LEAST[MembershipRole.OWNER])
 
 
 async def admin_required(auth_data: tuple[AuthJWT, dict, str] = Depends(multitenancy_protected)):
-    authorize, user_claims, org_id = auth_data
-    user_roles = user_claims["org_roles"].get(org_id, [])
-    if not any(role in user_roles for role in ["admin", "owner"]):
-        detail = (
-            f"Required roles: {["admin", "owner"]}. User roles: {user_roles}" if settings.debug else RULE_PROTECTED_TEXT
-        )
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
-
-    return authorize, user_claims, org_id
+    return _check_roles(auth_data, ROLES_AT_LEAST[MembershipRole.ADMIN])
 
 
 async def dispatcher_required(auth_data: tuple[AuthJWT, dict, str] = Depends(multitenancy_protected)):
-    authorize, user_claims, org_id = auth_data
-    user_roles = user_claims["org_roles"].get(org_id, [])
-    if not any(role in user_roles for role in ["dispatcher", "admin", "owner"]):
-        detail = (
-            f"Required roles: {["dispatcher", "admin", "owner"]}. User roles: {user_roles}"
-            if settings.debug
-            else RULE_PROTECTED_TEXT
-        )
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
-
-    return authorize, user_claims, org_id
+    return _check_roles(auth_data, ROLES_AT_LEAST[MembershipRole.DISPATCHER])
 
 
 async def courier_required(auth_data: tuple[AuthJWT, dict, str] = Depends(multitenancy_protected)):
-    authorize, user_claims, org_id = auth_data
-    user_roles = user_claims["org_roles"].get(org_id, [])
-    if not any(role in user_roles for role in ["courier", "dispatcher", "admin", "owner"]):
-        detail = (
-            f"Required roles: {["courier", "dispatcher", "admin", "owner"]}. User roles: {user_roles}"
-            if settings.debug
-            else RULE_PROTECTED_TEXT
-        )
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+    return _check_roles(auth_data, ROLES_AT_LEAST[MembershipRole.COURIER])
 
-    return authorize, user_claims, org_id
+
+def missing_scopes(granted: int, required_scopes: list[str]) -> list[str]:
+    """Scopes of `required_scopes` not in the `granted` mask."""
+
+    return [scope for scope in required_scopes if not SCOPE_BITS.get(scope, UNKNOWN_SCOPE) & granted]
 
 
 def scope_required(required_scopes: list[str]):
@@ -167,17 +202,17 @@ def scope_required(required_scopes: list[str]):
     Usage: Depends(scope_required(["orders:read", "routes:write"]))
     """
 
+    required = scope_mask(required_scopes)
+
     async def _scope_check(
         auth_data: tuple[AuthJWT, dict, str] = Depends(multitenancy_protected),
     ) -> tuple[AuthJWT, dict, str]:
         authorize, user_claims, org_id = auth_data
 
-        scopes = user_claims["scopes"]
-        missing_scopes = [scope for scope in required_scopes if scope not in scopes]
-        if missing_scopes:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN, detail=f"Missing required scopes: {missing_scopes}"
-            )
+        granted = org_scope_mask(user_claims["org_roles"], org_id)
+        if required & ~granted:
+            missing = missing_scopes(granted, required_scopes)
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Missing required scopes: {missing}")
         return authorize, user_claims, org_id
 
     return _scope_check
@@ -0,0 +1,134 @@
+from enum import IntEnum
+
+from redis.asyncio import Redis
+
+from core.settings import settings
+from db.redis_db import get_script
+from security.rate_limit import TOKEN_BUCKET_LUA, RateLimitPolicy, local_rate_limiter, token_identifier
+from security.revocation import issued_at_us, revoked_before_key, revoked_token_key
+
+# KEYS: revoked.<jti>, revoked_before.<user_id>, refresh session key, rate limit bucket, org quota bucket
+# ARGV: token issue time in microseconds, check session (0/1),
+#       bucket capacity (0 - off), bucket refill rate per second, tokens taken from the bucket locally,
+#       org bucket capacity (0 - off), org bucket refill rate per second, tokens taken from the org bucket locally
+# Returns {status, tokens left in the bucket, tokens left in the org bucket}, -1 tokens for a bucket that is off.
+# The locally taken tokens are written off whatever the status is, a token is taken only from allowed requests.
+AUTH_GATE_LUA = (
+    TOKEN_BUCKET_LUA
+    + """
+local function written_off(key, capacity, rate, pending)
+    if capacity <= 0 then
+        return -1, 0
+    end
+    local tokens, now = refill(key, capacity, rate)
+    return math.max(0, tokens - pending), now
+end
+
+local capacity, rate = tonumber(ARGV[3]), tonumber(ARGV[4])
+local org_capacity, org_rate = tonumber(ARGV[6]), tonumber(ARGV[7])
+local tokens, now = written_off(KEYS[4], capacity, rate, tonumber(ARGV[5]))
+local org_tokens, org_now = written_off(KEYS[5], org_capacity, org_rate, tonumber(ARGV[8]))
+
+local status = 0
+local revoked_before = redis.call('GET', KEYS[2])
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    status = 1
+elseif revoked_before and tonumber(ARGV[1]) < tonumber(revoked_before) then
+    status = 1
+elseif ARGV[2] == '1' and redis.call('EXISTS', KEYS[3]) == 0 then
+    status = 2
+elseif capacity > 0 and tokens < 1 then
+    status = 3
+elseif org_capacity > 0 and org_tokens < 1 then
+    status = 4
+else
+    if capacity > 0 then
+        tokens = tokens - 1
+    end
+    if org_capacity > 0 then
+        org_tokens = org_tokens - 1
+    end
+end
+
+if capacity > 0 then
+    store(KEYS[4], tokens, now, capacity, rate)
+end
+if org_capacity > 0 then
+    store(KEYS[5], org_tokens, org_now, org_capacity, org_rate)
+end
+return {status, math.floor(tokens), math.floor(org_tokens)}
+"""
+)
+
+# Bucket key passed when the request has no organization bucket, the script does not touch it
+NO_BUCKET = "rl.none"
+
+
+class GateStatus(IntEnum):
+    OK = 0
+    REVOKED = 1
+    SESSION_EXPIRED = 2
+    RATE_LIMITED = 3
+    ORG_QUOTA_EXCEEDED = 4
+
+
+def session_key(user_claims: dict) -> str:
+    """Refresh token key of the session the access token belongs to (see Tokens.create)."""
+
+    _, session = user_claims["sub"].split(".", 1)
+    return f"refresh.{session}"
+
+
+async def check_auth_gate(
+    redis: Redis,
+    user_claims: dict,
+    policy: RateLimitPolicy,
+    org_id: str | None = None,
+    org_policy: RateLimitPolicy | None = None,
+) -> GateStatus:
+    """Revocation, session liveness, rate limit and organization quota checks in one Redis round trip.
+
+    The Lua script is loaded once and then executed with EVALSHA. With local rate limiting
+    the tokens are taken in worker memory while both buckets are far from empty, the script
+    then only checks revocation and the session. Otherwise the locally taken tokens are
+    written off and the buckets are checked exactly.
+    """
+
+    user_bucket = (policy, policy.bucket_key(token_identifier(policy, user_claims))) if policy.enabled else None
+    org_bucket = None
+    if org_id is not None and org_policy is not None and org_policy.enabled:
+        org_bucket = (org_policy, org_policy.bucket_key(f"org.{org_id}"))
+
+    buckets = [bucket for bucket in (user_bucket, org_bucket) if bucket is not None]
+    local = local_rate_limiter.enabled and local_rate_limiter.take_all(buckets)
+
+    def bucket_args(bucket: tuple[RateLimitPolicy, str] | None) -> list:
+        if bucket is None or local:
+            return [0, 0, 0]
+
+        bucket_policy, key = bucket
+        return [bucket_policy.capacity, bucket_policy.rate, local_rate_limiter.write_off(key)]
+
+    script = get_script(redis, AUTH_GATE_LUA)
+    status, tokens, org_tokens = await script(
+        keys=[
+            revoked_token_key(user_claims["jti"]),
+            revoked_before_key(user_claims["user_id"]),
+            session_key(user_claims),
+            user_bucket[1] if user_bucket is not None else NO_BUCKET,
+            org_bucket[1] if org_bucket is not None else NO_BUCKET,
+        ],
+        args=[
+            issued_at_us(user_claims),
+            int(settings.auth_session_check),
+            *bucket_args(user_bucket),
+            *bucket_args(org_bucket),
+        ],
+    )
+
+    if local_rate_limiter.enabled and not local:
+        for bucket, left in ((user_bucket, tokens), (org_bucket, org_tokens)):
+            if bucket is not None:
+                local_rate_limiter.store(*bucket, int(left))
+
+    return GateStatus(int(status))
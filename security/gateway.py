@@ -0,0 +1,27 @@
+import secrets
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from starlette import status
+
+from core.settings import settings
+
+gateway_basic = HTTPBasic(auto_error=False)
+
+
+async def gateway_client(credentials: HTTPBasicCredentials | None = Depends(gateway_basic)) -> str:
+    """Id of the gateway calling the verify endpoints that take tokens in the body.
+
+    Clients are authenticated with HTTP Basic against VERIFY_CLIENTS (client id -> secret),
+    without configured clients the endpoints are closed.
+    """
+
+    secret = settings.verify_clients.get(credentials.username) if credentials is not None else None
+    if secret is None or not secrets.compare_digest(credentials.password.encode(), secret.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid client credentials",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+
+    return credentials.username
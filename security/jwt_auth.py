@@ -0,0 +1,76 @@
+import time
+
+import jwt
+from async_fastapi_jwt_auth import AuthJWT as BaseAuthJWT
+from async_fastapi_jwt_auth.exceptions import AccessTokenRequired, InvalidHeaderError, JWTDecodeError
+
+from .keys import get_key_ring
+from .token_cache import token_cache
+
+
+class AuthJWT(BaseAuthJWT):
+    """AuthJWT with key ring support and a verified-token cache.
+
+    Without AUTHJWT_KEYS_DIR it behaves exactly like the library class (HS256 with
+    the shared secret). With a key ring, tokens are signed by the current key and
+    verified by the key referenced in the `kid` header.
+
+    The library verifies the token again on every get_raw_jwt/get_jwt_subject call,
+    so decoded claims are kept in token_cache until the token expires.
+
+    Tokens carry `iat_us`, the issue time in microseconds, for the revoked-before mark.
+    """
+
+    async def _create_token(self, *args, user_claims: dict | None = None, **kwargs) -> str:
+        user_claims = {**(user_claims or {}), "iat_us": time.time_ns() // 1000}
+        return await super()._create_token(*args, user_claims=user_claims, **kwargs)
+
+    async def _get_secret_key(self, algorithm: str, process: str):
+        key_ring = get_key_ring()
+        if key_ring is not None and process == "encode" and algorithm == key_ring.current.algorithm:
+            return key_ring.current.private_key
+
+        return await super()._get_secret_key(algorithm, process)
+
+    async def verified_access_token(self, encoded_token: str) -> dict:
+        """Claims of a valid access token passed in the request body rather than in the header."""
+
+        claims = await self._verified_token(encoded_token, self._decode_issuer)
+        if claims.get("type") != "access":
+            raise AccessTokenRequired(status_code=422, message="Only access tokens are allowed")
+
+        return claims
+
+    async def _verified_token(self, encoded_token: str, issuer: str | None = None) -> dict:
+        claims = token_cache.get(encoded_token, issuer)
+        if claims is None:
+            claims = await self._decode_token(encoded_token, issuer)
+            token_cache.set(encoded_token, claims, issuer)
+
+        return claims
+
+    async def _decode_token(self, encoded_token: str, issuer: str | None = None) -> dict:
+        key_ring = get_key_ring()
+        if key_ring is None:
+            return await super()._verified_token(encoded_token, issuer)
+
+        try:
+            unverified_headers = jwt.get_unverified_header(encoded_token)
+        except Exception as err:
+            raise InvalidHeaderError(status_code=422, message=str(err))
+
+        key = key_ring.get(unverified_headers.get("kid"))
+        if key is None:
+            raise JWTDecodeError(status_code=422, message="Unknown signing key")
+
+        try:
+            return jwt.decode(
+                encoded_token,
+                key.public_key,
+                issuer=issuer,
+                audience=self._decode_audience,
+                leeway=self._decode_leeway,
+                algorithms=[key.algorithm],
+            )
+        except Exception as err:
+            raise JWTDecodeError(status_code=422, message=str(err))
@@ -0,0 +1,109 @@
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Any, Self
+
+from core.settings import settings
+
+try:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+    from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+except ImportError:  # pragma: no cover
+    serialization = None
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    """Asymmetric key pair identified by `kid` in the JWT header."""
+
+    kid: str
+    algorithm: str
+    private_key: Any
+    public_key: Any
+
+    @classmethod
+    def from_pem(cls, kid: str, pem: bytes) -> Self:
+        private_key = serialization.load_pem_private_key(pem, password=None)
+        if isinstance(private_key, rsa.RSAPrivateKey):
+            algorithm = "RS256"
+        elif isinstance(private_key, ed25519.Ed25519PrivateKey):
+            algorithm = "EdDSA"
+        else:
+            raise ValueError(f"Key {kid}: only RSA and Ed25519 keys are supported")
+
+        return cls(kid=kid, algorithm=algorithm, private_key=private_key, public_key=private_key.public_key())
+
+    def to_jwk(self) -> dict:
+        if self.algorithm == "RS256":
+            jwk = RSAAlgorithm.to_jwk(self.public_key, as_dict=True)
+        else:
+            jwk = OKPAlgorithm.to_jwk(self.public_key, as_dict=True)
+
+        return {**jwk, "kid": self.kid, "alg": self.algorithm, "use": "sig"}
+
+
+class KeyRing:
+    """Set of signing keys with one active key.
+
+    Keys are PEM files `<kid>.pem` in AUTHJWT_KEYS_DIR. New tokens are signed with
+    AUTHJWT_SIGNING_KID (the last kid in sort order by default), the other keys are
+    kept for verification and published in JWKS until they are removed from the dir.
+    """
+
+    def __init__(self, keys: dict[str, SigningKey], signing_kid: str) -> None:
+        if signing_kid not in keys:
+            raise ValueError(f"Signing key {signing_kid} not found in key ring")
+
+        self.keys = keys
+        self.signing_kid = signing_kid
+
+    @classmethod
+    def from_directory(cls, path: str, signing_kid: str | None = None) -> Self:
+        if serialization is None:
+            raise RuntimeError("Asymmetric signing requires 'cryptography', install async-fastapi-jwt-auth[asymmetric]")
+
+        keys = {
+            file.stem: SigningKey.from_pem(file.stem, file.read_bytes()) for file in sorted(Path(path).glob("*.pem"))
+        }
+        if not keys:
+            raise ValueError(f"No *.pem keys found in {path}")
+
+        return cls(keys=keys, signing_kid=signing_kid or next(reversed(keys)))
+
+    @property
+    def current(self) -> SigningKey:
+        return self.keys[self.signing_kid]
+
+    def get(self, kid: str | None) -> SigningKey | None:
+        return self.keys.get(kid)
+
+    def jwks(self) -> dict:
+        return {"keys": [key.to_jwk() for key in self.keys.values()]}
+
+
+def generate_private_key(algorithm: str) -> bytes:
+    """Generate a new private key in PEM format for the key ring directory."""
+
+    if algorithm == "RS256":
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        raise ValueError(f"Unsupported algorithm {algorithm}")
+
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
+
+@cache
+def get_key_ring() -> KeyRing | None:
+    """Key ring from settings, None when tokens are signed with the shared secret."""
+
+    if not settings.authjwt_keys_dir:
+        return None
+
+    return KeyRing.from_directory(settings.authjwt_keys_dir, settings.authjwt_signing_kid)
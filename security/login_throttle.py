@@ -0,0 +1,141 @@
+import logging
+import math
+import time
+from hashlib import blake2b
+
+from fastapi import HTTPException
+from redis.asyncio import Redis
+from starlette import status
+
+from core.settings import settings
+from db.redis_db import get_script
+from security.passwords import PasswordHashingService, password_hasher
+
+logger = logging.getLogger("api")
+
+# KEYS: failures and lock of the email, failures and lock of the IP
+# ARGV: now, failure window, base lockout, max lockout, max failures per email, max failures per IP
+# Returns the longest lockout set by this failure, 0 when the login is not locked. 0 max failures disable a key.
+RECORD_FAILURE_LUA = """
+local now, window, base, max_lockout = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+
+local function fail(counter, lock, max_failures)
+    if max_failures <= 0 then
+        return 0
+    end
+    local failures = redis.call('INCR', counter)
+    redis.call('EXPIRE', counter, window)
+    if failures < max_failures then
+        return 0
+    end
+    local lockout = math.ceil(math.min(max_lockout, base * 2 ^ (failures - max_failures)))
+    redis.call('SET', lock, now + lockout, 'EX', lockout)
+    return lockout
+end
+
+return math.max(fail(KEYS[1], KEYS[2], tonumber(ARGV[5])), fail(KEYS[3], KEYS[4], tonumber(ARGV[6])))
+"""
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+class LoginThrottle:
+    """Brute-force protection of password login.
+
+    Failed attempts are counted per normalized email and per client IP within
+    `window` seconds. Starting with `max_email_failures` (`max_ip_failures`) failures
+    the email (IP) is locked for `base_lockout` seconds, doubled with every further
+    failure up to `max_lockout`. Locked attempts are rejected before the user is
+    loaded and the password is hashed, a successful login clears the email counter.
+    """
+
+    def __init__(
+        self,
+        max_email_failures: int,
+        max_ip_failures: int,
+        window: int,
+        base_lockout: int,
+        max_lockout: int,
+        hasher: PasswordHashingService = password_hasher,
+    ) -> None:
+        self.max_email_failures = max_email_failures
+        self.max_ip_failures = max_ip_failures
+        self.window = window
+        self.base_lockout = base_lockout
+        self.max_lockout = max_lockout
+        self.hasher = hasher
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_email_failures > 0 or self.max_ip_failures > 0
+
+    @property
+    def saved_hash_cpu_time(self) -> float:
+        """Estimated CPU seconds of password verification avoided by rejected attempts."""
+
+        return self.rejected * self.hasher.average_verify_cpu_time
+
+    def stats(self) -> dict:
+        return {"rejected": self.rejected, "saved_hash_cpu_seconds": round(self.saved_hash_cpu_time, 3)}
+
+    @staticmethod
+    def _keys(email: str, ip: str) -> list[str]:
+        email_id = blake2b(normalize_email(email).encode(), digest_size=16).hexdigest()
+        return [
+            f"login_failures.email.{email_id}",
+            f"login_lock.email.{email_id}",
+            f"login_failures.ip.{ip}",
+            f"login_lock.ip.{ip}",
+        ]
+
+    async def check(self, redis: Redis, email: str, ip: str) -> None:
+        """Raise 429 with Retry-After while the email or the IP is locked."""
+
+        if not self.enabled:
+            return
+
+        _, email_lock, _, ip_lock = self._keys(email, ip)
+        locked_until = max((float(value) for value in await redis.mget(email_lock, ip_lock) if value), default=0)
+        retry_after = math.ceil(locked_until - time.time())
+        if retry_after > 0:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many failed login attempts",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+    async def record_failure(self, redis: Redis, email: str, ip: str) -> None:
+        if not self.enabled:
+            return
+
+        script = get_script(redis, RECORD_FAILURE_LUA)
+        lockout = await script(
+            keys=self._keys(email, ip),
+            args=[
+                time.time(),
+                self.window,
+                self.base_lockout,
+                self.max_lockout,
+                self.max_email_failures,
+                self.max_ip_failures,
+            ],
+        )
+        if int(lockout):
+            logger.warning(f"Login from {ip} locked for {lockout}s, throttling stats: {self.stats()}")
+
+    async def reset(self, redis: Redis, email: str, ip: str) -> None:
+        if self.enabled:
+            await redis.delete(self._keys(email, ip)[0])
+
+
+login_throttle = LoginThrottle(
+    max_email_failures=settings.login_max_failures_per_email,
+    max_ip_failures=settings.login_max_failures_per_ip,
+    window=settings.login_failure_window,
+    base_lockout=settings.login_lockout_base,
+    max_lockout=settings.login_lockout_max,
+)
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError
+from argon2.low_level import Type as Argon2Type
+
+from core.settings import settings
+
+# Initialize Argon2 password hasher with secure defaults
+ph = PasswordHasher(
+    time_cost=2,
+    memory_cost=65536,  # 64 MiB
+    parallelism=1,
+    hash_len=32,
+    type=Argon2Type.ID,
+)
+
+
+class PasswordHasherBusyError(Exception):
+    """Raised when the hashing queue is full and the request must be rejected."""
+
+
+def _hash(password: str) -> str:
+    return ph.hash(password)
+
+
+def _verify(password_hash: str, password: str) -> tuple[bool, float]:
+    """Verify the password, also return CPU time spent by the worker."""
+
+    started = time.thread_time()
+    try:
+        verified = ph.verify(password_hash, password)
+
+    except VerifyMismatchError:
+        verified = False
+
+    return verified, time.thread_time() - started
+
+
+class PasswordHashingService:
+    """Argon2 hashing and verification off the event loop.
+
+    Each call costs tens of milliseconds of CPU and 64 MiB of memory, so it is
+    executed in a bounded worker pool. argon2-cffi releases the GIL, so the
+    thread pool gives real parallelism; the process pool is available for
+    deployments that prefer isolation.
+
+    At most `workers + queue_size` operations may be in flight. Further calls
+    fail fast with PasswordHasherBusyError instead of piling up behind the pool.
+    """
+
+    def __init__(self, workers: int, queue_size: int, executor: str = "thread") -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        self.executor_type = executor
+        self._executor: Executor | None = None
+        self._in_flight = 0
+        self._verifications = 0
+        self._verify_cpu_time = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def average_verify_cpu_time(self) -> float:
+        """Mean CPU seconds of one verification, 0 until the first one."""
+
+        return self._verify_cpu_time / self._verifications if self._verifications else 0.0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="argon2")
+
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self._in_flight >= self.workers + self.queue_size:
+            raise PasswordHasherBusyError("Password hashing queue is full")
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+
+        finally:
+            self._in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify(self, password_hash: str, password: str) -> bool:
+        verified, cpu_time = await self._run(_verify, password_hash, password)
+        self._verifications += 1
+        self._verify_cpu_time += cpu_time
+        return verified
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHashingService(
+    workers=settings.password_hash_workers,
+    queue_size=settings.password_hash_queue_size,
+    executor=settings.password_hash_executor,
+)
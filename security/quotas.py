@@ -0,0 +1,118 @@
+import time
+from dataclasses import dataclass
+from uuid import UUID
+
+from redis.asyncio import Redis
+
+from constants import Plan
+from core.settings import settings
+from db.redis_db import get_script
+from models.membership import Membership
+from models.organization import Organization
+from security.rate_limit import RateLimitKey, RateLimitPolicy
+
+
+@dataclass(frozen=True)
+class PlanLimits:
+    """Quotas of an organization plan. `seats=None` means unlimited memberships."""
+
+    requests_per_minute: int
+    seats: int | None
+
+
+PLAN_LIMITS = {
+    Plan.FREE: PlanLimits(requests_per_minute=60, seats=5),
+    Plan.BASIC: PlanLimits(requests_per_minute=300, seats=25),
+    Plan.PREMIUM: PlanLimits(requests_per_minute=1200, seats=100),
+    Plan.ULTIMATE: PlanLimits(requests_per_minute=6000, seats=None),
+}
+
+PLAN_POLICIES = {
+    plan: RateLimitPolicy(name=f"org_{plan}", requests=limits.requests_per_minute, key=RateLimitKey.ORG)
+    for plan, limits in PLAN_LIMITS.items()
+}
+
+# KEYS: seats counter; ARGV: seat limit. Returns -1 when the counter is not initialized yet.
+RESERVE_SEAT_LUA = """
+local seats = redis.call('GET', KEYS[1])
+if not seats then
+    return -1
+end
+if tonumber(seats) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+return 1
+"""
+
+# KEYS: seats counter. An uninitialized counter is left for reserve_seat to recount.
+RELEASE_SEAT_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('DECR', KEYS[1])
+end
+return 0
+"""
+
+# How long the seat counter is trusted before it is recounted from the database
+SEATS_COUNTER_TTL = 24 * 60 * 60
+
+
+class PlanCache:
+    """In-process cache of organization plans, refreshed every `ttl` seconds."""
+
+    def __init__(self, ttl: int) -> None:
+        self.ttl = ttl
+        self._plans: dict[str, tuple[float, Plan]] = {}
+
+    async def get(self, org_id: str) -> Plan:
+        entry = self._plans.get(org_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        org = await Organization.get_by_id(org_id, org_id)
+        plan = Plan(org.plan) if org is not None else Plan.FREE
+        self._plans[org_id] = (time.monotonic() + self.ttl, plan)
+        return plan
+
+    def invalidate(self, org_id: str) -> None:
+        self._plans.pop(org_id, None)
+
+
+plan_cache = PlanCache(ttl=settings.org_plan_cache_ttl)
+
+
+def seats_key(org_id: str) -> str:
+    return f"org.{org_id}.seats"
+
+
+async def org_quota_policy(org_id: str) -> RateLimitPolicy:
+    """Request bucket policy of the organization plan, taken by the auth gate."""
+
+    return PLAN_POLICIES[await plan_cache.get(str(org_id))]
+
+
+async def reserve_seat(redis: Redis, org_id: str | UUID) -> bool:
+    """Reserve a membership seat of the organization, False when the plan has no free seats.
+
+    The counter lives in Redis and is initialized from the number of memberships in the
+    database. Call release_seat if the membership was not created after all.
+    """
+
+    org_id = str(org_id)
+    limits = PLAN_LIMITS[await plan_cache.get(org_id)]
+    if limits.seats is None:
+        return True
+
+    script = get_script(redis, RESERVE_SEAT_LUA)
+    reserved = int(await script(keys=[seats_key(org_id)], args=[limits.seats]))
+    if reserved == -1:
+        seats = await Membership.count_org_memberships(org_id)
+        await redis.set(seats_key(org_id), seats, nx=True, ex=SEATS_COUNTER_TTL)
+        reserved = int(await script(keys=[seats_key(org_id)], args=[limits.seats]))
+
+    return reserved == 1
+
+
+async def release_seat(redis: Redis, org_id: str | UUID) -> None:
+    script = get_script(redis, RELEASE_SEAT_LUA)
+    await script(keys=[seats_key(str(org_id))])
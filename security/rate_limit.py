@@ -1,29 +1,330 @@
-from datetime import datetime
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass
+from enum import StrEnum
+
+from fastapi import Depends, HTTPException, Request
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from starlette import status
 
 from core.settings import settings
-from db.redis_db import get_redis
+from db.redis_db import get_redis, get_script
 
+logger = logging.getLogger("api")
 
-async def is_rate_limit_exceeded(token):
-    """Проверка лимита запросов.
+# Token bucket shared by the rate limit scripts and the auth gate script.
+# Time comes from the Redis server, so all workers share one clock.
+TOKEN_BUCKET_LUA = """
+local function refill(key, capacity, rate)
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    local bucket = redis.call('HMGET', key, 't', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    return math.min(capacity, tokens + math.max(0, now - ts) * rate), now
+end
+
+local function store(key, tokens, now, capacity, rate)
+    redis.call('HSET', key, 't', tokens, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+
+local function take_token(key, capacity, rate)
+    local tokens, now = refill(key, capacity, rate)
+    local allowed = tokens >= 1
+    if allowed then
+        tokens = tokens - 1
+    end
+    store(key, tokens, now, capacity, rate)
+    return allowed
+end
+"""
+
+# KEYS: bucket key; ARGV: capacity, refill rate per second
+RATE_LIMIT_LUA = (
+    TOKEN_BUCKET_LUA
+    + """
+if take_token(KEYS[1], tonumber(ARGV[1]), tonumber(ARGV[2])) then
+    return 1
+end
+return 0
+"""
+)
+
+# KEYS: bucket key; ARGV: capacity, refill rate per second, tokens taken locally, tokens to take now.
+# Returns {1 if the tokens to take now were available, tokens left in the bucket}.
+SYNC_BUCKET_LUA = (
+    TOKEN_BUCKET_LUA
+    + """
+local capacity, rate = tonumber(ARGV[1]), tonumber(ARGV[2])
+local tokens, now = refill(KEYS[1], capacity, rate)
+tokens = math.max(0, tokens - tonumber(ARGV[3]))
+local allowed = 0
+if tokens >= tonumber(ARGV[4]) then
+    tokens = tokens - tonumber(ARGV[4])
+    allowed = 1
+end
+store(KEYS[1], tokens, now, capacity, rate)
+return {allowed, math.floor(tokens)}
+"""
+)
+
+
+class RateLimitKey(StrEnum):
+    """Identifier the budget is counted for."""
+
+    USER = "user"
+    ORG = "org"
+    IP = "ip"
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """Token bucket: `requests` per `period` seconds with bursts up to `burst` requests.
+
+    Policies keyed by user or org are enforced by full_protected together with the other
+    auth checks, IP policies are enforced by the RateLimit dependency before authentication.
+    A policy with `requests == 0` is disabled.
+    """
+
+    name: str
+    requests: int
+    period: int = 60
+    burst: int | None = None
+    key: RateLimitKey = RateLimitKey.USER
+
+    @property
+    def capacity(self) -> int:
+        return self.burst or self.requests
+
+    @property
+    def rate(self) -> float:
+        return self.requests / self.period
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests > 0
+
+    @property
+    def retry_after(self) -> int:
+        return math.ceil(self.period / self.requests)
+
+    def bucket_key(self, identifier: str) -> str:
+        return f"rl.{self.name}.{identifier}"
+
+
+DEFAULT_POLICY = RateLimitPolicy(name="default", requests=settings.request_limit)
+VERIFY_POLICY = RateLimitPolicy(name="verify", requests=settings.verify_request_limit)
+LOGIN_POLICY = RateLimitPolicy(name="login", requests=settings.login_request_limit, key=RateLimitKey.IP)
+GATEWAY_POLICY = RateLimitPolicy(name="gateway", requests=settings.gateway_request_limit, key=RateLimitKey.IP)
+
+
+class RateLimit:
+    """Dependency declaring the rate limit policy of a route or a router.
+
+    Usage: APIRouter(dependencies=[Depends(RateLimit(LOGIN_POLICY))])
+    """
+
+    def __init__(self, policy: RateLimitPolicy) -> None:
+        self.policy = policy
+
+    async def __call__(self, request: Request, redis: Redis = Depends(get_redis)) -> None:
+        if self.policy.key != RateLimitKey.IP:
+            # Checked by full_protected once the token is verified
+            return
+
+        if await is_rate_limit_exceeded(redis, self.policy, client_ip(request)):
+            raise too_many_requests(self.policy)
+
+
+def route_policy(request: Request) -> RateLimitPolicy:
+    """Policy declared for the matched route (the innermost one wins), DEFAULT_POLICY otherwise."""
+
+    route = request.scope.get("route")
+    policy = DEFAULT_POLICY
+    for dependency in getattr(route, "dependencies", []):
+        if isinstance(dependency.dependency, RateLimit) and dependency.dependency.policy.key != RateLimitKey.IP:
+            policy = dependency.dependency.policy
+
+    return policy
+
+
+def token_identifier(policy: RateLimitPolicy, user_claims: dict) -> str:
+    """Compact bucket identifier of an authenticated request."""
+
+    if policy.key == RateLimitKey.ORG and user_claims.get("org"):
+        return f"org.{user_claims['org']}"
+
+    return user_claims["user_id"]
+
+
+def client_ip(request: Request) -> str:
+    if settings.rate_limit_trust_proxy and (forwarded_for := request.headers.get("X-Forwarded-For")):
+        return forwarded_for.split(",", 1)[0].strip()
 
-    Проверяет сколько запросов за текущую минуту сделал пользователь
-    и возвращает True при превышении лимита запросов.
+    return request.client.host if request.client else "unknown"
 
-    Пользователем считается владелец access-токена
 
-    Если REQUEST_LIMIT_PER_MINUTE равен 0 - лимит запросов не проверяется
+def too_many_requests(policy: RateLimitPolicy) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests",
+        headers={"Retry-After": str(policy.retry_after)},
+    )
+
+
+@dataclass
+class LocalBucket:
+    policy: RateLimitPolicy
+    tokens: float
+    synced_at: float
+    pending: int = 0
+
+    def available(self, now: float) -> float:
+        refilled = min(self.policy.capacity, self.tokens + (now - self.synced_at) * self.policy.rate)
+        return refilled - self.pending
+
+
+class LocalRateLimiter:
+    """Approximate rate limiting in worker memory with batched Redis synchronisation.
+
+    Every bucket checked in Redis is remembered with the number of tokens left in it.
+    While the bucket holds at least `overshoot` tokens, up to `overshoot` requests per
+    bucket are admitted locally and the taken tokens are written off to Redis by one
+    pipeline every `sync_interval` seconds. Requests of nearly exhausted buckets and of
+    buckets unused since the last sync are checked in Redis exactly.
+
+    Each worker may admit at most `overshoot` requests per bucket that other workers do
+    not see yet, so the limit can be exceeded by `workers * overshoot` requests.
+    The user and org buckets of the auth gate are counted the same way (see check_auth_gate),
+    the gate call itself stays for the revocation and session checks.
+    """
+
+    def __init__(self, sync_interval: float, overshoot: int) -> None:
+        self.sync_interval = sync_interval
+        self.overshoot = overshoot
+        self._buckets: dict[str, LocalBucket] = {}
+        self._task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.sync_interval > 0 and self.overshoot > 0
+
+    def take(self, policy: RateLimitPolicy, key: str) -> bool:
+        """Take a token locally, False when the request must be checked in Redis."""
+
+        return self.take_all([(policy, key)])
+
+    def take_all(self, buckets: list[tuple[RateLimitPolicy, str]]) -> bool:
+        """Take a token of every bucket locally, or of none when any of them must be checked in Redis."""
+
+        now = time.monotonic()
+        for _, key in buckets:
+            bucket = self._buckets.get(key)
+            if bucket is None or bucket.pending >= self.overshoot or bucket.available(now) < self.overshoot:
+                return False
+
+        for _, key in buckets:
+            self._buckets[key].pending += 1
+
+        return True
+
+    def write_off(self, key: str) -> int:
+        """Tokens taken locally from the bucket, the caller writes them off in Redis."""
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return 0
+
+        pending, bucket.pending = bucket.pending, 0
+        return pending
+
+    async def check(self, redis: Redis, policy: RateLimitPolicy, key: str) -> bool:
+        """Take a token in Redis together with the tokens taken locally, True when allowed."""
+
+        script = get_script(redis, SYNC_BUCKET_LUA)
+        allowed, tokens = await script(keys=[key], args=[policy.capacity, policy.rate, self.write_off(key), 1])
+        self.store(policy, key, tokens)
+        return bool(int(allowed))
+
+    async def sync(self, redis: Redis) -> None:
+        """Write off tokens taken locally and refresh the buckets, forget idle ones."""
+
+        synced = {}
+        for key, bucket in list(self._buckets.items()):
+            if bucket.pending:
+                synced[key] = (bucket.policy, bucket.pending)
+                bucket.pending = 0
+            elif bucket.synced_at < time.monotonic() - self.sync_interval:
+                del self._buckets[key]
+
+        if not synced:
+            return
+
+        script = get_script(redis, SYNC_BUCKET_LUA)
+        async with redis.pipeline(transaction=False) as pipe:
+            for key, (policy, pending) in synced.items():
+                await script(keys=[key], args=[policy.capacity, policy.rate, pending, 0], client=pipe)
+            results = await pipe.execute()
+
+        for (key, (policy, _)), (_, tokens) in zip(synced.items(), results, strict=False):
+            self.store(policy, key, tokens)
+
+    def store(self, policy: RateLimitPolicy, key: str, tokens: int) -> None:
+        """Remember the tokens left in the bucket after an exact check in Redis."""
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = LocalBucket(policy=policy, tokens=int(tokens), synced_at=time.monotonic())
+        else:
+            bucket.tokens = int(tokens)
+            bucket.synced_at = time.monotonic()
+
+    async def _run(self, redis: Redis) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync(redis)
+            except RedisError as err:
+                logger.warning(f"Rate limit sync failed: {err}")
+
+    def start(self, redis: Redis) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run(redis))
+
+    async def stop(self, redis: Redis) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            await self.sync(redis)
+
+
+local_rate_limiter = LocalRateLimiter(
+    sync_interval=settings.rate_limit_sync_ms / 1000,
+    overshoot=settings.rate_limit_local_overshoot,
+)
+
+
+async def is_rate_limit_exceeded(redis: Redis, policy: RateLimitPolicy, identifier: str) -> bool:
+    """Проверка лимита запросов.
+
+    Берет токен из корзины `identifier` по политике `policy` и возвращает True,
+    если корзина пуста. Выключенная политика (requests == 0) не проверяется.
+    При RATE_LIMIT_SYNC_MS > 0 токены берутся локально и списываются в Redis пачками.
     """
-    if settings.request_limit == 0:
+    if not policy.enabled:
         return False
 
-    redis = await get_redis()
-    now = datetime.now()
-    key = f"{token}:{now.minute}"
+    key = policy.bucket_key(identifier)
+    if local_rate_limiter.enabled:
+        if local_rate_limiter.take(policy, key):
+            return False
+
+        return not await local_rate_limiter.check(redis, policy, key)
 
-    pipe = redis.pipeline()
-    pipe.incr(key, 1)
-    pipe.expire(key, 60)
-    result = await pipe.execute()
-    request_number = result[0]
-    return request_number > settings.request_limit
+    script = get_script(redis, RATE_LIMIT_LUA)
+    allowed = await script(keys=[key], args=[policy.capacity, policy.rate])
+    return not int(allowed)
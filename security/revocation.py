@@ -0,0 +1,56 @@
+import time
+
+from redis.asyncio import Redis
+
+from core.settings import settings
+
+
+def revoked_token_key(jti: str) -> str:
+    return f"revoked.{jti}"
+
+
+def revoked_before_key(user_id: str) -> str:
+    return f"revoked_before.{user_id}"
+
+
+async def revoke_token(redis: Redis, user_claims: dict) -> None:
+    """Revoke a single token by its jti until the token expires by itself."""
+
+    ttl = int(user_claims["exp"] - time.time()) + 1
+    if ttl > 0:
+        await redis.set(revoked_token_key(user_claims["jti"]), 1, ex=ttl)
+
+
+def issued_at_us(user_claims: dict) -> int:
+    """Issue time of the token in microseconds, tokens without `iat_us` count from the start of their `iat` second."""
+
+    return int(user_claims.get("iat_us", int(user_claims["iat"]) * 1_000_000))
+
+
+async def revoke_user_tokens(redis: Redis, user_id: str) -> None:
+    """Revoke every token of the user issued before now ("log out everywhere").
+
+    The mark is kept for the lifetime of a refresh token, the longest-lived token we issue.
+    It is compared with the `iat_us` claim, so no token of the second of the logout survives.
+    """
+
+    await redis.set(revoked_before_key(user_id), time.time_ns() // 1000, ex=settings.authjwt_refresh_token_expires)
+
+
+def revocation_keys(user_claims: dict) -> list[str]:
+    return [revoked_token_key(user_claims["jti"]), revoked_before_key(user_claims["user_id"])]
+
+
+def is_revoked(user_claims: dict, revoked: str | None, revoked_before: str | None) -> bool:
+    """Decide on the values of the revocation_keys of the token."""
+
+    if revoked is not None:
+        return True
+
+    return revoked_before is not None and issued_at_us(user_claims) < int(revoked_before)
+
+
+async def is_token_revoked(redis: Redis, user_claims: dict) -> bool:
+    """Check both revocation marks of the token with a single MGET."""
+
+    return is_revoked(user_claims, *await redis.mget(*revocation_keys(user_claims)))
@@ -1,4 +1,5 @@
 from enum import StrEnum
+from itertools import chain
 
 
 class UserRole(StrEnum):
@@ -61,7 +62,7 @@ class MediaScopes(BaseServiceScopes):
     service = "media"
 
 
-def role_to_scopes(role: str) -> list[str]:
+def _build_role_scopes() -> dict[UserRole, list[str]]:
     """Map roles to scopes/permissions"""
 
     profile_scopes = ProfileScopes()
@@ -71,7 +72,7 @@ def role_to_scopes(role: str) -> list[str]:
     couriers_scopes = CouriersScopes()
     media_scopes = MediaScopes()
 
-    role_scopes = {
+    return {
         UserRole.OWNER: [
             *profile_scopes.full_access,
             *users_scopes.full_access,
@@ -89,17 +90,17 @@ def role_to_scopes(role: str) -> list[str]:
             *media_scopes.full_access,
         ],
         UserRole.DISPATCHER: [
-            *profile_scopes.write_self,
+            profile_scopes.write_self,
             *users_scopes.full_access,
-            *organisations_scopes.read_self,
+            organisations_scopes.read_self,
             *routes_scopes.full_access,
             *couriers_scopes.full_access,
             media_scopes.read,
             media_scopes.write_self,
         ],
         UserRole.COURIER: [
-            *profile_scopes.write_self,
-            *organisations_scopes.read_self,
+            profile_scopes.write_self,
+            organisations_scopes.read_self,
             routes_scopes.write_self,
             routes_scopes.read_self,
             couriers_scopes.write_self,
@@ -109,4 +110,39 @@ def role_to_scopes(role: str) -> list[str]:
         ],
         UserRole.VIEWER: [profile_scopes.read_self],
     }
-    return role_scopes.get(UserRole(role), [])
+
+
+# The policy is compiled once: every known scope is a bit, every role is the mask of its scopes
+ROLE_SCOPES = {role: tuple(scopes) for role, scopes in _build_role_scopes().items()}
+SCOPE_BITS = {scope: 1 << index for index, scope in enumerate(dict.fromkeys(chain.from_iterable(ROLE_SCOPES.values())))}
+# Bit of the scopes no role grants, so requiring one always fails
+UNKNOWN_SCOPE = 1 << len(SCOPE_BITS)
+
+
+def scope_mask(scopes: list[str]) -> int:
+    mask = 0
+    for scope in scopes:
+        mask |= SCOPE_BITS.get(scope, UNKNOWN_SCOPE)
+
+    return mask
+
+
+ROLE_SCOPE_MASKS = {role: scope_mask(scopes) for role, scopes in ROLE_SCOPES.items()}
+
+
+def role_to_scopes(role: str) -> tuple[str, ...]:
+    return ROLE_SCOPES.get(UserRole(role), ())
+
+
+def org_scope_mask(org_roles: dict[str, list[str]], org_id: str) -> int:
+    """Scopes of the organization in the `org_roles` claim as a mask, see org_scopes."""
+
+    roles = org_roles.get(org_id)
+    return ROLE_SCOPE_MASKS.get(roles[-1], 0) if roles else 0
+
+
+def org_scopes(org_roles: dict[str, list[str]], org_id: str) -> set[str]:
+    """Scopes of the organization in the `org_roles` claim, as UserResponse.to_user_claims grants them."""
+
+    roles = org_roles.get(org_id)
+    return set(role_to_scopes(role=roles[-1])) if roles else set()
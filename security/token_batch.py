@@ -0,0 +1,95 @@
+from enum import StrEnum
+
+from async_fastapi_jwt_auth.exceptions import AuthJWTException
+from redis.asyncio import Redis
+
+from constants import UserStatus
+from core.settings import settings
+from models import User
+from security.auth_gate import session_key
+from security.jwt_auth import AuthJWT
+from security.revocation import is_revoked, revocation_keys
+from security.scopes import SCOPE_BITS, UNKNOWN_SCOPE, org_scope_mask, org_scopes
+
+
+class TokenError(StrEnum):
+    INVALID = "invalid_token"
+    REVOKED = "revoked"
+    SESSION_EXPIRED = "session_expired"
+    USER_NOT_FOUND = "user_not_found"
+    USER_INACTIVE = "user_inactive"
+    ORG_FORBIDDEN = "org_forbidden"
+
+
+def claims_for_org(user_claims: dict, org_id: str | None) -> dict:
+    """Token claims switched to the organization, as UserResponse.to_user_claims builds them."""
+
+    if org_id is None:
+        return user_claims
+
+    return {**user_claims, "org": org_id, "scopes": " ".join(sorted(org_scopes(user_claims["org_roles"], org_id)))}
+
+
+async def verify_token_batch(authorize: AuthJWT, redis: Redis, checks: list[tuple[str, str | None]]) -> list[dict]:
+    """Verify (token, org id) pairs at once, every check gets claims or an error.
+
+    Each distinct token is decoded once (through token_cache), revocation marks and
+    sessions of all tokens are read with one MGET and user statuses with one query.
+    """
+
+    claims_by_token: dict[str, dict] = {}
+    errors: dict[str, TokenError] = {}
+    for token in dict.fromkeys(token for token, _ in checks):
+        try:
+            claims_by_token[token] = await authorize.verified_access_token(token)
+        except (AuthJWTException, KeyError, ValueError):
+            errors[token] = TokenError.INVALID
+
+    keys = []
+    for claims in claims_by_token.values():
+        keys += revocation_keys(claims)
+        if settings.auth_session_check:
+            keys.append(session_key(claims))
+
+    step = 3 if settings.auth_session_check else 2
+    values = await redis.mget(*keys) if keys else []
+    for index, (token, claims) in enumerate(claims_by_token.items()):
+        revoked, revoked_before, *session = values[index * step : (index + 1) * step]
+        if is_revoked(claims, revoked, revoked_before):
+            errors[token] = TokenError.REVOKED
+        elif session and session[0] is None:
+            errors[token] = TokenError.SESSION_EXPIRED
+
+    user_ids = {claims["user_id"] for token, claims in claims_by_token.items() if token not in errors}
+    statuses = await User.get_statuses(list(user_ids)) if user_ids else {}
+
+    results = []
+    for token, org_id in checks:
+        error = errors.get(token)
+        claims = claims_by_token.get(token)
+        if error is None:
+            user_status = statuses.get(claims["user_id"])
+            if user_status is None:
+                error = TokenError.USER_NOT_FOUND
+            elif user_status != UserStatus.ACTIVE:
+                error = TokenError.USER_INACTIVE
+            elif org_id is not None and org_id not in claims.get("org_roles", {}):
+                error = TokenError.ORG_FORBIDDEN
+
+        results.append({"error": error} if error is not None else {"claims": claims_for_org(claims, org_id)})
+
+    return results
+
+
+def check_permissions(user_claims: dict, checks: list[tuple[str, str]]) -> list[bool]:
+    """Whether the token grants each (scope, org id) pair, scopes of an organization are resolved once."""
+
+    masks_by_org: dict[str, int] = {}
+    results = []
+    for scope, org_id in checks:
+        granted = masks_by_org.get(org_id)
+        if granted is None:
+            granted = masks_by_org[org_id] = org_scope_mask(user_claims.get("org_roles", {}), org_id)
+        results.append(bool(SCOPE_BITS.get(scope, UNKNOWN_SCOPE) & granted))
+
+    return results
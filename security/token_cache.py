@@ -0,0 +1,71 @@
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+
+from core.settings import settings
+
+
+class TokenCache:
+    """Bounded LRU cache of verified JWT claims.
+
+    Entries are keyed by a digest of the encoded token and live until the token's
+    `exp`, but no longer than `max_ttl` seconds. Only successfully verified tokens
+    are stored, so a cache hit means the signature and the expiration have already
+    been checked. Revocation is not cached and is checked on every request.
+    """
+
+    def __init__(self, maxsize: int, max_ttl: int) -> None:
+        self.maxsize = maxsize
+        self.max_ttl = max_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+
+    @staticmethod
+    def _key(encoded_token: str, issuer: str | None) -> bytes:
+        return blake2b(f"{issuer}:{encoded_token}".encode(), digest_size=16).digest()
+
+    def get(self, encoded_token: str, issuer: str | None = None) -> dict | None:
+        if self.maxsize == 0:
+            return None
+
+        key = self._key(encoded_token, issuer)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(entry[1])
+
+    def set(self, encoded_token: str, claims: dict, issuer: str | None = None) -> None:
+        if self.maxsize == 0:
+            return
+
+        now = time.time()
+        expires_at = now + self.max_ttl
+        if "exp" in claims:
+            expires_at = min(expires_at, claims["exp"])
+
+        if expires_at <= now:
+            return
+
+        key = self._key(encoded_token, issuer)
+        self._entries[key] = (expires_at, dict(claims))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache(maxsize=settings.token_cache_size, max_ttl=settings.token_cache_max_ttl)
@@ -19,7 +19,6 @@ db = [
     {
         "email": "test@test.ru",
         "phone": "0123456789",
-        "password": "password",
         "first_name": "Тест",
         "last_name": "Тестов",
     }
@@ -82,7 +81,7 @@ def mock_get_user():
 
 @pytest.fixture
 def mock_user_check_password():
-    def inner(self, password: str) -> bool:
+    async def inner(self, password: str) -> bool:
         return password == "password"
 
     return inner
@@ -100,7 +99,7 @@ def mock_user_change_password():
 
 @pytest.fixture
 def mock_user_get_all():
-    async def inner(page, page_size):
+    async def inner(page, page_size, after=None):
         user = User(**db[0])
         user.id = UUID(USER_UUID)
         return [user]
@@ -118,7 +117,7 @@ def mock_membership_get_user_memberships():
 
 @pytest.fixture
 def mock_history_get_by_user_id():
-    async def inner(user_id: UUID, page, page_size):
+    async def inner(user_id: UUID, page, page_size, after=None, since=None, until=None):
         history = History(
             user_id=user_id,
             user_agent="testclient",
@@ -148,6 +147,7 @@ def client(
     monkeypatch.setattr(CRUDMixin, "save", mock_save)
     monkeypatch.setattr(User, "delete", mock_get_user)
     monkeypatch.setattr(User, "get_by_email", mock_user_get_by_email)
+    monkeypatch.setattr(User, "get_for_login", mock_user_get_by_email)
     monkeypatch.setattr(User, "get_by_id", mock_user_get_by_id)
     monkeypatch.setattr(User, "check_password", mock_user_check_password)
     monkeypatch.setattr(User, "change_password", mock_user_change_password)
@@ -1,10 +1,16 @@
 import asyncio
+import time
+from uuid import UUID
 
 import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
 
+from models import User
+from security.login_throttle import LoginThrottle, login_throttle
 from tests.functional.settings import test_settings  # noqa
-from tests.functional.testdata.data import USER
-from tests.functional.utils import get_headers, redis_flush
+from tests.functional.testdata.data import USER, USER_UUID
+from tests.functional.utils import count_statements, get_headers, redis_flush
 
 loop = asyncio.get_event_loop()
 pytestmark = pytest.mark.asyncio
@@ -54,3 +60,100 @@ async def test_login(client, mock_redis, login_data, status_code, result_keys):
     assert list(data.keys()) == result_keys
 
     await redis_flush(mock_redis)
+
+
+# Not patched by the client fixture
+get_for_login = User.__dict__["get_for_login"]
+
+
+async def test_login_reads_user_in_one_statement(client, mock_redis, monkeypatch):
+    user = User(**{key: value for key, value in USER.items() if key not in {"password", "status"}})
+    user.id, user.status, user.memberships = UUID(USER_UUID), "active", []
+    monkeypatch.setattr(User, "get_for_login", get_for_login)
+    statements = count_statements(monkeypatch, rows=[(user,)])
+
+    response = client.post(
+        "api/v1/auth/login", json={"email": USER["email"], "password": USER["password"]}, headers=await get_headers()
+    )
+    assert response.status_code == 200
+    assert len(statements) == 1
+
+    sql = str(statements[0].compile(dialect=postgresql.dialect()))
+    select_list, from_clause = sql.split("\nFROM ")
+    join = "users LEFT OUTER JOIN memberships AS memberships_1 ON users.id = memberships_1.user_id"
+    assert from_clause.startswith(join)
+    assert "users.password" in select_list
+    assert "memberships_1.role" in select_list
+    # load_only: timestamps are not read
+    assert "created_at" not in select_list
+    assert "updated_at" not in select_list
+
+    await redis_flush(mock_redis)
+
+
+async def test_locked_login_is_rejected_before_password_check(client, mock_redis):
+    redis = await mock_redis()
+    _, email_lock, _, _ = login_throttle._keys(" Test@Test.ru", "testclient")
+    await redis.set(email_lock, time.time() + 60)
+    rejected = login_throttle.rejected
+
+    response = client.post(
+        "api/v1/auth/login", json={"email": USER["email"], "password": "wrong"}, headers=await get_headers()
+    )
+    assert response.status_code == 429
+    assert 0 < int(response.headers["Retry-After"]) <= 60
+    assert login_throttle.rejected == rejected + 1
+
+    await redis_flush(mock_redis)
+
+
+@pytest.mark.parametrize("logout_url", ["api/v1/auth/logout", "api/v1/auth/logout_all"])
+async def test_logout_revokes_token(client, mock_redis, logout_url):
+    headers = await get_headers(USER)
+    assert client.get("api/v1/profile/", headers=headers).status_code == 200
+
+    response = client.post(logout_url, headers=headers)
+    assert response.status_code == 200
+
+    response = client.get("api/v1/profile/", headers=headers)
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Signature has blocked"}
+
+    await redis_flush(mock_redis)
+
+
+async def test_token_of_ended_session_is_rejected(client, mock_redis):
+    headers = await get_headers(USER)
+    await redis_flush(mock_redis)
+
+    response = client.get("api/v1/profile/", headers=headers)
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Session has expired"}
+
+
+async def test_logout_all_revokes_tokens_of_the_same_second(client, mock_redis):
+    other_device = await get_headers(USER)
+    headers = await get_headers(USER)
+    assert client.post("api/v1/auth/logout_all", headers=headers).status_code == 200
+    assert client.get("api/v1/profile/", headers=other_device).status_code == 401
+
+    # The re-login that follows the logout, usually within the same second
+    headers = await get_headers(USER)
+    assert client.get("api/v1/profile/", headers=headers).status_code == 200
+
+    await redis_flush(mock_redis)
+
+
+async def test_failures_lock_the_email(mock_redis):
+    redis = await mock_redis()
+    throttle = LoginThrottle(max_email_failures=2, max_ip_failures=0, window=60, base_lockout=10, max_lockout=60)
+
+    await throttle.record_failure(redis, USER["email"], "10.0.0.1")
+    await throttle.check(redis, USER["email"], "10.0.0.2")
+    await throttle.record_failure(redis, USER["email"], "10.0.0.1")
+    with pytest.raises(HTTPException) as error:
+        await throttle.check(redis, USER["email"], "10.0.0.2")
+    assert error.value.status_code == 429
+    assert 0 < int(error.value.headers["Retry-After"]) <= 10
+
+    await redis_flush(mock_redis)
@@ -0,0 +1,59 @@
+from contextlib import asynccontextmanager
+from datetime import UTC, date, datetime
+from types import SimpleNamespace
+
+import pytest
+
+from core.settings import settings
+from models.history import maintain_history_partitions, month_start, partition_name
+
+
+class RecordingEngine:
+    """Engine of maintain_history_partitions: records the DDL, answers the partition listing."""
+
+    def __init__(self, url: str, partitions: list[str]) -> None:
+        self.url = url
+        self.partitions = partitions
+        self.statements: list[str] = []
+        self.disposed = False
+
+    @asynccontextmanager
+    async def begin(self):
+        yield self
+
+    async def execute(self, statement, parameters=None):
+        self.statements.append(str(statement))
+        return SimpleNamespace(scalars=lambda: iter(self.partitions))
+
+    async def dispose(self) -> None:
+        self.disposed = True
+
+
+def test_partition_months():
+    assert month_start(date(2026, 11, 30), shift=2) == datetime(2027, 1, 1, tzinfo=UTC)
+    assert month_start(date(2026, 1, 15), shift=-13) == datetime(2024, 12, 1, tzinfo=UTC)
+    assert partition_name(datetime(2027, 1, 1, tzinfo=UTC)) == "history_y2027m01"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("drop", [False, True])
+async def test_maintenance_runs_as_the_migration_role(monkeypatch, drop):
+    today = datetime.now(UTC).date()
+    current, expired = partition_name(month_start(today)), partition_name(month_start(today, -13))
+    engines = []
+
+    def create_async_engine(url, **kwargs):
+        engines.append(RecordingEngine(url, ["history_default", current, expired]))
+        return engines[0]
+
+    monkeypatch.setattr("models.history.create_async_engine", create_async_engine)
+    created, removed = await maintain_history_partitions(ahead=1, retention=12, drop=drop)
+
+    engine = engines[0]
+    assert engine.url == str(settings.migrate_pg_dsn)
+    assert engine.disposed
+    assert created == [partition_name(month_start(today, 1))]
+    assert removed == [expired]
+    assert f"ALTER TABLE history ATTACH PARTITION {created[0]} " in "".join(engine.statements)
+    assert f"ALTER TABLE history DETACH PARTITION {expired}" in engine.statements
+    assert (f"DROP TABLE {expired}" in engine.statements) == drop
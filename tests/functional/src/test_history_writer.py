@@ -0,0 +1,113 @@
+import asyncio
+from contextlib import asynccontextmanager
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from models.history import HistoryWriter
+
+pytestmark = pytest.mark.asyncio
+
+DELETED_USER = uuid4()
+
+
+class FakeSession:
+    def __init__(self, batches, fail):
+        self.batches = batches
+        self.fail = fail
+
+    async def execute(self, statement, rows):
+        if self.fail:
+            raise OperationalError("INSERT", {}, OSError("connection refused"))
+        if any(row["user_id"] == DELETED_USER for row in rows):
+            raise IntegrityError("INSERT", {}, ValueError("history_user_id_fkey"))
+        self.batches.append(len(rows))
+
+
+def fake_own_session(batches, fail=False):
+    @asynccontextmanager
+    async def get_own_session():
+        yield FakeSession(batches, fail)
+
+    return get_own_session
+
+
+async def test_records_are_flushed_in_batches(monkeypatch):
+    batches = []
+    monkeypatch.setattr("models.history.get_own_session", fake_own_session(batches))
+    writer = HistoryWriter(flush_interval=60, batch_size=3, max_pending=10)
+    writer.start()
+
+    for _ in range(3):
+        await writer.record(uuid4(), "testclient")
+    await asyncio.sleep(0.01)
+    assert batches == [3]
+
+    await writer.record(uuid4(), "testclient")
+    assert batches == [3]
+
+    await writer.stop()
+    assert batches == [3, 1]
+    assert writer.stats()["written"] == 4
+
+
+async def test_full_buffer_is_dropped_when_database_is_down(monkeypatch):
+    batches = []
+    monkeypatch.setattr("models.history.get_own_session", fake_own_session(batches, fail=True))
+    writer = HistoryWriter(flush_interval=60, batch_size=10, max_pending=2)
+    writer.start()
+
+    for _ in range(3):
+        await writer.record(uuid4(), "testclient")
+
+    assert writer.stats() == {
+        "pending": 2,
+        "written": 0,
+        "dropped": 1,
+        "backpressured": 1,
+        "failed_flushes": 1,
+        "rejected": 0,
+    }
+
+    monkeypatch.setattr("models.history.get_own_session", fake_own_session(batches))
+    await writer.stop()
+    assert batches == [2]
+
+
+async def test_rejected_records_do_not_stall_the_buffer(monkeypatch):
+    batches = []
+    monkeypatch.setattr("models.history.get_own_session", fake_own_session(batches))
+    writer = HistoryWriter(flush_interval=60, batch_size=3, max_pending=10)
+    writer.start()
+
+    for user_id in (uuid4(), DELETED_USER, uuid4(), uuid4()):
+        await writer.record(user_id, "testclient")
+    await writer.stop()
+
+    assert batches == [1, 1, 1]
+    assert writer.stats()["pending"] == 0
+    assert (writer.written, writer.rejected) == (3, 1)
+
+
+async def test_stop_waits_for_the_running_flush(monkeypatch):
+    batches = []
+    inserting = asyncio.Event()
+
+    @asynccontextmanager
+    async def slow_session():
+        inserting.set()
+        await asyncio.sleep(0.05)
+        yield FakeSession(batches, fail=False)
+
+    monkeypatch.setattr("models.history.get_own_session", slow_session)
+    writer = HistoryWriter(flush_interval=60, batch_size=2, max_pending=10)
+    writer.start()
+
+    for _ in range(2):
+        await writer.record(uuid4(), "testclient")
+    await inserting.wait()
+    await writer.stop()
+
+    assert batches == [2]
+    assert writer.stats()["written"] == 2
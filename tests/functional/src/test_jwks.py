@@ -0,0 +1,51 @@
+import jwt
+import pytest
+
+from core.settings import settings
+from schemas import Tokens, UserResponse
+from security.jwt_auth import AuthJWT
+from security.keys import generate_private_key, get_key_ring
+from tests.functional.testdata.data import USER, USER_UUID
+from tests.functional.utils import get_headers, redis_flush
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def key_ring(tmp_path, monkeypatch):
+    (tmp_path / "2024-01.pem").write_bytes(generate_private_key("RS256"))
+    (tmp_path / "2024-02.pem").write_bytes(generate_private_key("EdDSA"))
+    monkeypatch.setattr(settings, "authjwt_keys_dir", str(tmp_path))
+    get_key_ring.cache_clear()
+    yield get_key_ring()
+    get_key_ring.cache_clear()
+
+
+async def test_jwks_empty(client):
+    response = client.get("/.well-known/jwks.json", headers=await get_headers())
+    assert response.status_code == 200
+    assert response.json() == {"keys": []}
+
+
+async def test_tokens_verified_by_jwks(client, mock_redis, key_ring):
+    response = client.get("/.well-known/jwks.json", headers=await get_headers())
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == f"public, max-age={settings.jwks_cache_max_age}"
+    jwks = jwt.PyJWKSet.from_dict(response.json())
+    assert sorted(key.key_id for key in jwks.keys) == ["2024-01", "2024-02"]
+
+    user = UserResponse.model_validate({**USER, "id": USER_UUID})
+    tokens = await Tokens.create(authorize=AuthJWT(), user=user, user_agent="testclient")
+    header = jwt.get_unverified_header(tokens.access_token)
+    assert header == {"alg": "EdDSA", "kid": "2024-02", "typ": "JWT"}
+
+    claims = jwt.decode(tokens.access_token, jwks["2024-02"].key, algorithms=["EdDSA"])
+    assert claims["user_id"] == USER_UUID
+
+    response = client.get(
+        "api/v1/profile/", headers={**await get_headers(), "Authorization": f"Bearer {tokens.access_token}"}
+    )
+    assert response.status_code == 200
+    assert response.json()["user_id"] == USER_UUID
+
+    await redis_flush(mock_redis)
@@ -0,0 +1,76 @@
+from datetime import timedelta
+from uuid import uuid4
+
+import pytest
+
+from constants import MembershipRole
+from db.membership_snapshot import MembershipSnapshot, membership_snapshot
+from db.user_cache import user_cache
+from models import Membership, Organization
+from models.mixins import CRUDMixin
+from tests.functional.redis import MockRedis
+from tests.functional.testdata.data import USER_UUID
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_served_until_version_bump(monkeypatch):
+    redis = MockRedis()
+    monkeypatch.setattr("db.redis_db.redis", redis)
+    snapshot = MembershipSnapshot(ttl=timedelta(seconds=60))
+    loads = []
+
+    async def loader():
+        loads.append(USER_UUID)
+        return {"id": USER_UUID, "memberships": [{"role": "admin"}] * len(loads)}
+
+    assert (await snapshot.get(USER_UUID, loader))["memberships"] == [{"role": "admin"}]
+    assert (await snapshot.get(USER_UUID, loader))["memberships"] == [{"role": "admin"}]
+    assert len(loads) == 1
+
+    await snapshot.bump(USER_UUID)
+    assert 0 < await redis.ttl(snapshot.version_key(USER_UUID)) <= 60
+    assert len((await snapshot.get(USER_UUID, loader))["memberships"]) == 2
+    assert len((await snapshot.get(USER_UUID, loader))["memberships"]) == 2
+    assert snapshot.stats() == {"hits": 2, "misses": 2}
+
+
+@pytest.mark.asyncio
+async def test_organization_delete_outdates_members(monkeypatch):
+    redis = MockRedis()
+    monkeypatch.setattr("db.redis_db.redis", redis)
+    org = Organization(org_id=uuid4(), name="Org", slug="org")
+    members = [Membership(org_id=org.id, user_id=USER_UUID, role=MembershipRole.OWNER)]
+
+    async def get_org_memberships(org_id):
+        return members
+
+    async def delete(self, *args, **kwargs):
+        return self
+
+    monkeypatch.setattr(Membership, "get_org_memberships", get_org_memberships)
+    monkeypatch.setattr(CRUDMixin, "delete", delete)
+    await redis.set(user_cache.id_key(USER_UUID), "{}")
+
+    await org.delete()
+    assert await redis.get(user_cache.id_key(USER_UUID)) is None
+    assert int(await redis.get(membership_snapshot.version_key(USER_UUID))) > 0
+
+
+@pytest.mark.asyncio
+async def test_expired_version_does_not_repeat(monkeypatch):
+    redis = MockRedis()
+    monkeypatch.setattr("db.redis_db.redis", redis)
+    snapshot = MembershipSnapshot(ttl=timedelta(seconds=60))
+    loads = []
+
+    async def loader():
+        loads.append(USER_UUID)
+        return {"id": USER_UUID, "loads": len(loads)}
+
+    await snapshot.bump(USER_UUID)
+    assert (await snapshot.get(USER_UUID, loader))["loads"] == 1
+
+    # The version key expires before the snapshot, the next bump must not match it again
+    await redis.delete(snapshot.version_key(USER_UUID))
+    await snapshot.bump(USER_UUID)
+    assert (await snapshot.get(USER_UUID, loader))["loads"] == 2
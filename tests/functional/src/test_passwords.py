@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from security.passwords import PasswordHasherBusyError, PasswordHashingService
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_hash_and_verify():
+    service = PasswordHashingService(workers=1, queue_size=1)
+    password_hash = await service.hash("password")
+
+    assert await service.verify(password_hash, "password") is True
+    assert await service.verify(password_hash, "wrong") is False
+    service.shutdown()
+
+
+async def test_queue_limit():
+    service = PasswordHashingService(workers=1, queue_size=1)
+    password_hash = await service.hash("password")
+
+    results = await asyncio.gather(
+        *(service.verify(password_hash, "password") for _ in range(3)),
+        return_exceptions=True,
+    )
+
+    assert results.count(True) == 2
+    assert isinstance(results[2], PasswordHasherBusyError)
+    assert service.in_flight == 0
+    service.shutdown()
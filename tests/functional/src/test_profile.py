@@ -1,9 +1,12 @@
 import asyncio
+from datetime import UTC, datetime
+from uuid import UUID
 
 import pytest
 
+from models import History
 from tests.functional.settings import test_settings  # noqa
-from tests.functional.testdata.data import USER
+from tests.functional.testdata.data import USER, USER_UUID
 from tests.functional.utils import get_headers, redis_flush
 
 loop = asyncio.get_event_loop()
@@ -20,6 +23,7 @@ pytestmark = pytest.mark.asyncio
             {
                 "first_name": "Тест",
                 "id": "345fa6c5-c138-4f5c-bce5-a35b0f26fced",
+                "user_id": "345fa6c5-c138-4f5c-bce5-a35b0f26fced",
                 "last_name": "Тестов",
                 "email": "test@test.ru",
                 "phone": "0123456789",
@@ -35,7 +39,7 @@ async def test_profile(client, mock_redis, user, status_code, result):
     response = client.get("api/v1/profile/", headers=await get_headers(user))
     assert response.status_code == status_code
     data = response.json()
-    data = {k: v for k, v in data.items() if k not in {"exp", "jti", "nbf", "sub", "fresh", "iat"}}
+    data = {k: v for k, v in data.items() if k not in {"exp", "jti", "nbf", "sub", "fresh", "iat", "iat_us"}}
     assert data == result
 
     await redis_flush(mock_redis)
@@ -133,3 +137,31 @@ async def test_profile_change_password(client, mock_redis, user, change_password
     assert data == result
 
     await redis_flush(mock_redis)
+
+
+async def test_profile_history_cursor(client, mock_redis, monkeypatch):
+    pages = []
+
+    async def get_by_user_id(user_id, page, page_size, after=None, since=None, until=None):
+        pages.append(after)
+        history = History(user_id=user_id, user_agent="testclient")
+        history.id = UUID(USER_UUID)
+        history.created_at = datetime(2023, 4, 1, tzinfo=UTC)
+        return [history]
+
+    monkeypatch.setattr(History, "get_by_user_id", get_by_user_id)
+    headers = await get_headers(USER)
+
+    response = client.get("api/v1/profile/history", params={"page_size": 1}, headers=headers)
+    assert response.status_code == 200
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get("api/v1/profile/history", params={"page_size": 2, "cursor": cursor}, headers=headers)
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+    assert pages == [None, (datetime(2023, 4, 1, tzinfo=UTC), UUID(USER_UUID))]
+
+    response = client.get("api/v1/profile/history", params={"cursor": "broken"}, headers=headers)
+    assert response.status_code == 400
+
+    await redis_flush(mock_redis)
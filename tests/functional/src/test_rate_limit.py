@@ -0,0 +1,192 @@
+from types import SimpleNamespace
+
+import pytest
+from starlette.requests import Request
+
+from constants import Plan
+from main import app
+from models import Organization
+from security.auth import is_org_route
+from security.auth_gate import GateStatus, check_auth_gate
+from security.quotas import PLAN_POLICIES, PlanCache
+from security.rate_limit import (
+    DEFAULT_POLICY,
+    VERIFY_POLICY,
+    LocalRateLimiter,
+    RateLimitKey,
+    RateLimitPolicy,
+    is_rate_limit_exceeded,
+    route_policy,
+    token_identifier,
+)
+from security.revocation import revoked_before_key
+from tests.functional.redis import MockRedis
+
+
+def request_for(path: str, method: str) -> Request:
+    route = next(route for route in app.routes if route.path == path and method in route.methods)
+    return Request({"type": "http", "headers": [], "route": route})
+
+
+@pytest.mark.parametrize(
+    "path, method, policy",
+    [
+        ("/api/v1/verify/token", "POST", VERIFY_POLICY),
+        ("/api/v1/profile/", "GET", DEFAULT_POLICY),
+        # IP policy of login is enforced before authentication
+        ("/api/v1/auth/login", "POST", DEFAULT_POLICY),
+    ],
+)
+def test_route_policy(path, method, policy):
+    assert route_policy(request_for(path, method)) == policy
+
+
+def test_token_identifier():
+    user_claims = {"user_id": "user", "org": "org"}
+
+    assert token_identifier(RateLimitPolicy("users", 10), user_claims) == "user"
+    assert token_identifier(RateLimitPolicy("orgs", 10, key=RateLimitKey.ORG), user_claims) == "org.org"
+    assert token_identifier(RateLimitPolicy("orgs", 10, key=RateLimitKey.ORG), {"user_id": "user"}) == "user"
+
+
+def test_plan_policies():
+    assert all(policy.key == RateLimitKey.ORG for policy in PLAN_POLICIES.values())
+    assert PLAN_POLICIES[Plan.FREE].capacity < PLAN_POLICIES[Plan.ULTIMATE].capacity
+
+
+@pytest.mark.asyncio
+async def test_plan_cache(monkeypatch):
+    calls = []
+
+    async def get_by_id(org_id, current_org):
+        calls.append(org_id)
+        return SimpleNamespace(plan=Plan.PREMIUM) if org_id == "org" else None
+
+    monkeypatch.setattr(Organization, "get_by_id", get_by_id)
+    plan_cache = PlanCache(ttl=60)
+
+    assert await plan_cache.get("org") == Plan.PREMIUM
+    assert await plan_cache.get("org") == Plan.PREMIUM
+    assert await plan_cache.get("missing") == Plan.FREE
+    assert calls == ["org", "missing"]
+
+    plan_cache.invalidate("org")
+    await plan_cache.get("org")
+    assert calls == ["org", "missing", "org"]
+
+
+@pytest.mark.asyncio
+async def test_local_rate_limiter():
+    redis = MockRedis()
+    limiter = LocalRateLimiter(sync_interval=1, overshoot=3)
+    policy = RateLimitPolicy("local", 100)
+
+    # Unknown bucket is checked in Redis, then up to `overshoot` requests are admitted locally
+    assert not limiter.take(policy, "rl.local.user")
+    assert await limiter.check(redis, policy, "rl.local.user")
+    assert [limiter.take(policy, "rl.local.user") for _ in range(4)] == [True, True, True, False]
+
+    # The next exact check writes off the tokens taken locally
+    assert await limiter.check(redis, policy, "rl.local.user")
+    # 100 - 1 exact check - 3 local - 1 exact check, plus the refill of a few milliseconds
+    assert 95 <= float(await redis.hget("rl.local.user", "t")) < 96
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_script():
+    redis = MockRedis()
+    policy = RateLimitPolicy("bucket", 3)
+
+    assert [await is_rate_limit_exceeded(redis, policy, "10.0.0.1") for _ in range(4)] == [False, False, False, True]
+    assert not await is_rate_limit_exceeded(redis, policy, "10.0.0.2")
+
+
+@pytest.mark.asyncio
+async def test_auth_gate_script():
+    redis = MockRedis()
+    policy = RateLimitPolicy("gate", 2)
+    user_claims = {
+        "jti": "jti",
+        "user_id": "user",
+        "iat": 1_700_000_000,
+        "iat_us": 1_700_000_000_250_000,
+        "sub": "access.user.agent",
+    }
+
+    assert await check_auth_gate(redis, user_claims, policy) == GateStatus.SESSION_EXPIRED
+    await redis.set("refresh.user.agent", "refresh token")
+    assert [await check_auth_gate(redis, user_claims, policy) for _ in range(3)] == [
+        GateStatus.OK,
+        GateStatus.OK,
+        GateStatus.RATE_LIMITED,
+    ]
+
+    # The revoked-before mark is compared in microseconds, not whole seconds
+    await redis.delete(policy.bucket_key("user"))
+    await redis.set(revoked_before_key("user"), user_claims["iat_us"])
+    assert await check_auth_gate(redis, user_claims, policy) == GateStatus.OK
+    await redis.set(revoked_before_key("user"), user_claims["iat_us"] + 1)
+    assert await check_auth_gate(redis, user_claims, policy) == GateStatus.REVOKED
+
+
+@pytest.mark.asyncio
+async def test_auth_gate_takes_org_quota():
+    redis = MockRedis()
+    policy, org_policy = RateLimitPolicy("gate", 10), RateLimitPolicy("org_gate", 1, key=RateLimitKey.ORG)
+    user_claims = {
+        "jti": "jti",
+        "user_id": "user",
+        "iat": 1_700_000_000,
+        "iat_us": 1_700_000_000_250_000,
+        "sub": "access.user.agent",
+    }
+    await redis.set("refresh.user.agent", "refresh token")
+
+    assert await check_auth_gate(redis, user_claims, policy, "org", org_policy) == GateStatus.OK
+    assert await check_auth_gate(redis, user_claims, policy, "org", org_policy) == GateStatus.ORG_QUOTA_EXCEEDED
+    assert await check_auth_gate(redis, user_claims, policy, "other", org_policy) == GateStatus.OK
+    assert await check_auth_gate(redis, user_claims, policy) == GateStatus.OK
+
+
+@pytest.mark.parametrize(
+    "path, method, org_route",
+    [
+        ("/api/v1/users/", "GET", True),
+        ("/api/v1/verify/token", "POST", True),
+        ("/api/v1/profile/", "GET", False),
+    ],
+)
+def test_org_routes(path, method, org_route):
+    assert is_org_route(request_for(path, method)) == org_route
+
+
+@pytest.mark.asyncio
+async def test_auth_gate_counts_buckets_locally(monkeypatch):
+    redis = MockRedis()
+    limiter = LocalRateLimiter(sync_interval=1, overshoot=2)
+    monkeypatch.setattr("security.auth_gate.local_rate_limiter", limiter)
+    policy, org_policy = RateLimitPolicy("gate", 100), RateLimitPolicy("org_gate", 100, key=RateLimitKey.ORG)
+    user_claims = {
+        "jti": "jti",
+        "user_id": "user",
+        "iat": 1_700_000_000,
+        "iat_us": 1_700_000_000_250_000,
+        "sub": "access.user.agent",
+    }
+    await redis.set("refresh.user.agent", "refresh token")
+
+    async def tokens_left() -> list[float]:
+        return [float(await redis.hget(key, "t")) for key in ("rl.gate.user", "rl.org_gate.org.org")]
+
+    # The first request is checked exactly, the next `overshoot` ones take tokens locally
+    assert await check_auth_gate(redis, user_claims, policy, "org", org_policy) == GateStatus.OK
+    assert [int(tokens) for tokens in await tokens_left()] == [99, 99]
+    for _ in range(2):
+        assert await check_auth_gate(redis, user_claims, policy, "org", org_policy) == GateStatus.OK
+    assert [int(tokens) for tokens in await tokens_left()] == [99, 99]
+
+    # Revocation is still checked in Redis on every request
+    await redis.set(revoked_before_key("user"), user_claims["iat_us"] + 1)
+    assert await check_auth_gate(redis, user_claims, policy, "org", org_policy) == GateStatus.REVOKED
+    # That request was checked exactly and wrote off the 2 local tokens without taking one
+    assert [int(tokens) for tokens in await tokens_left()] == [97, 97]
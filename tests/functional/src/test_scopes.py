@@ -0,0 +1,43 @@
+import pytest
+from fastapi import HTTPException
+
+from constants import MembershipRole
+from models import Membership
+from security.auth import admin_required, courier_required, scope_required
+from security.scopes import ROLE_SCOPES, UserRole, org_scope_mask, role_to_scopes, scope_mask
+
+ORG_ID = "6f1b5c3e-2b7a-4a0e-9a55-1d0c2b8c6a10"
+
+
+def auth_data(role: str) -> tuple:
+    return None, {"org_roles": {ORG_ID: [role]}, "org": ORG_ID, "scopes": ""}, ORG_ID
+
+
+def test_compiled_role_scopes():
+    assert "profile:write_self" in role_to_scopes(UserRole.DISPATCHER)
+    assert all(":" in scope for scopes in ROLE_SCOPES.values() for scope in scopes)
+
+    courier = org_scope_mask({ORG_ID: ["courier"]}, ORG_ID)
+    assert courier & scope_mask(["routes:read_self"])
+    assert not courier & scope_mask(["routes:read"])
+    assert not org_scope_mask({ORG_ID: ["owner"]}, ORG_ID) & scope_mask(["unknown:scope"])
+    assert org_scope_mask({ORG_ID: ["owner"]}, "other") == 0
+
+
+@pytest.mark.asyncio
+async def test_bitwise_dependencies():
+    assert await scope_required(["routes:read", "routes:write"])(auth_data=auth_data("dispatcher"))
+    with pytest.raises(HTTPException) as error:
+        await scope_required(["routes:read", "routes:read_self"])(auth_data=auth_data("courier"))
+    assert error.value.detail == "Missing required scopes: ['routes:read']"
+
+    assert await courier_required(auth_data=auth_data("admin"))
+    with pytest.raises(HTTPException):
+        await admin_required(auth_data=auth_data("dispatcher"))
+
+
+def test_membership_has_role():
+    membership = Membership(org_id=ORG_ID, user_id=ORG_ID, role=MembershipRole.DISPATCHER)
+    assert membership.has_role(MembershipRole.COURIER)
+    assert membership.has_role(MembershipRole.DISPATCHER)
+    assert not membership.has_role(MembershipRole.ADMIN)
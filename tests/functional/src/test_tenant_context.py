@@ -0,0 +1,49 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from db.postgres import engine, get_session
+
+pytestmark = pytest.mark.asyncio
+
+CURRENT_ORG = text("SELECT current_setting('app.org_id', true)")
+
+
+@pytest_asyncio.fixture
+async def postgres():
+    try:
+        async with engine.connect():
+            pass
+    except OSError as err:
+        pytest.skip(f"Postgres is not available: {err}")
+
+    yield engine
+    await engine.dispose()
+
+
+async def test_tenant_is_isolated_across_pooled_connections(postgres):
+    orgs = [str(uuid4()) for _ in range(50)]
+
+    async def tenant_of(org_id: str) -> list[str]:
+        async with get_session(org_id) as session:
+            seen = []
+            for _ in range(3):
+                seen.append(await session.scalar(CURRENT_ORG))
+                await asyncio.sleep(0)
+            return seen
+
+    results = await asyncio.gather(*(tenant_of(org_id) for org_id in orgs))
+    assert results == [[org_id] * 3 for org_id in orgs]
+
+    # Nothing is left on the connections returned to the pool
+    async def pooled_tenant() -> str | None:
+        async with postgres.connect() as connection:
+            tenant = await connection.scalar(CURRENT_ORG)
+            await asyncio.sleep(0.01)
+            return tenant
+
+    leftovers = await asyncio.gather(*(pooled_tenant() for _ in range(postgres.pool.size())))
+    assert not any(leftovers)
@@ -0,0 +1,34 @@
+import time
+
+from security.token_cache import TokenCache
+
+
+def test_hit_and_miss():
+    cache = TokenCache(maxsize=10, max_ttl=60)
+    claims = {"sub": "user", "exp": int(time.time()) + 60}
+
+    assert cache.get("token") is None
+    cache.set("token", claims)
+    assert cache.get("token") == claims
+    assert cache.get("token", issuer="other") is None
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 2}
+
+
+def test_expired_tokens_are_not_served():
+    cache = TokenCache(maxsize=10, max_ttl=60)
+    cache.set("expired", {"exp": int(time.time()) - 1})
+
+    assert cache.get("expired") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_eviction():
+    cache = TokenCache(maxsize=2, max_ttl=60)
+    cache.set("first", {"sub": "first"})
+    cache.set("second", {"sub": "second"})
+    cache.get("first")
+    cache.set("third", {"sub": "third"})
+
+    assert cache.get("second") is None
+    assert cache.get("first") == {"sub": "first"}
+    assert cache.get("third") == {"sub": "third"}
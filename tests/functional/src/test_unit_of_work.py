@@ -0,0 +1,58 @@
+import pytest
+
+from constants import DEFAULT_ORG_ID
+from db import postgres
+from db.postgres import UnitOfWork, _unit_of_work, get_read_session, get_session, unit_of_work
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_get_session_joins_unit_of_work(monkeypatch):
+    joined = []
+
+    async def join(self, org_id):
+        joined.append(org_id)
+        return self
+
+    monkeypatch.setattr(UnitOfWork, "join", join)
+    dependency = unit_of_work()
+    uow = await anext(dependency)
+
+    async with get_session() as session, get_session("org") as org_session:
+        assert session is org_session is uow
+
+    assert joined == [DEFAULT_ORG_ID, "org"]
+
+    await anext(dependency, None)
+    assert _unit_of_work.get() is None
+
+
+class FakeSession:
+    def __init__(self, name):
+        self.name = name
+
+    async def close(self):
+        pass
+
+
+async def test_reads_stick_to_primary_after_write(monkeypatch):
+    async def join(self, org_id):
+        return FakeSession("primary")
+
+    async def join_replica(self, org_id):
+        return FakeSession("replica")
+
+    monkeypatch.setattr(postgres, "replica_engine", object())
+    monkeypatch.setattr(UnitOfWork, "join", join)
+    monkeypatch.setattr(UnitOfWork, "join_replica", join_replica)
+    dependency = unit_of_work()
+    uow = await anext(dependency)
+
+    async with get_read_session() as session:
+        assert session.name == "replica"
+
+    uow.wrote = True
+    async with get_read_session() as session:
+        assert session.name == "primary"
+
+    await anext(dependency, None)
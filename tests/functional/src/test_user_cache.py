@@ -0,0 +1,96 @@
+import asyncio
+import uuid
+
+import pytest
+
+from db.user_cache import UserCache
+from models import User
+from tests.functional.redis import MockRedis
+
+
+class CachedUser:
+    def __init__(self, data: dict) -> None:
+        self.id = data["id"]
+        self.email = data["email"]
+
+    def to_cache(self) -> dict:
+        return {"id": self.id, "email": self.email}
+
+    @classmethod
+    def from_cache(cls, data: dict) -> "CachedUser":
+        return cls(data)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_coalesced(monkeypatch):
+    monkeypatch.setattr("db.redis_db.redis", MockRedis())
+    cache = UserCache(ttl=60)
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.01)
+        return CachedUser({"id": "1", "email": "user@test.ru"})
+
+    users = await asyncio.gather(*(cache.get_by_id(CachedUser, "1", loader) for _ in range(10)))
+    assert loads == 1
+    assert {user.email for user in users} == {"user@test.ru"}
+    assert (cache.misses, cache.coalesced) == (1, 9)
+
+    assert (await cache.get_by_email(CachedUser, "user@test.ru", loader)).id == "1"
+    assert cache.hits == 1
+
+    await cache.invalidate("1")
+    await cache.get_by_id(CachedUser, "1", loader)
+    assert loads == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_email_pointer_is_not_served(monkeypatch):
+    monkeypatch.setattr("db.redis_db.redis", MockRedis())
+    cache = UserCache(ttl=60)
+
+    async def old_loader():
+        return CachedUser({"id": "1", "email": "old@test.ru"})
+
+    async def new_loader():
+        return CachedUser({"id": "1", "email": "new@test.ru"})
+
+    await cache.get_by_email(CachedUser, "old@test.ru", old_loader)
+    await cache.invalidate("1")
+    await cache.get_by_id(CachedUser, "1", new_loader)
+
+    assert await cache.get_by_email(CachedUser, "old@test.ru", lambda: asyncio.sleep(0)) is None
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_is_not_overwritten(monkeypatch):
+    monkeypatch.setattr("db.redis_db.redis", MockRedis())
+    cache = UserCache(ttl=60)
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        user = CachedUser({"id": "1", "email": "user@test.ru"})
+        # A write of the user commits while the old row is being loaded
+        if loads == 1:
+            await cache.invalidate("1")
+        return user
+
+    await cache.get_by_id(CachedUser, "1", loader)
+    await cache.get_by_id(CachedUser, "1", loader)
+    assert loads == 2
+    await cache.get_by_id(CachedUser, "1", loader)
+    assert loads == 2
+
+
+def test_password_is_not_cached():
+    user = User(email="test@test.ru", phone="0123456789", password_hash="hash", first_name="", last_name="")
+    user.id = uuid.uuid4()
+    user.memberships = []
+
+    data = user.to_cache()
+    assert "password" not in data
+    assert User.from_cache(data).password is None
@@ -1,9 +1,16 @@
 import asyncio
+import time
+from uuid import uuid4
 
 import pytest
+from sqlalchemy.dialects import postgresql
 
+from constants import MembershipRole, Plan, UserStatus
+from security.jwt_auth import AuthJWT
+from security.quotas import plan_cache
 from tests.functional.settings import test_settings  # noqa
-from tests.functional.utils import get_admin_headers, redis_flush
+from tests.functional.testdata.data import USER_UUID
+from tests.functional.utils import count_statements, get_admin_headers, redis_flush
 
 loop = asyncio.get_event_loop()
 pytestmark = pytest.mark.asyncio
@@ -92,3 +99,31 @@ async def test_users_delete(client, mock_redis, id_, status_code, result):
     assert data == result
 
     await redis_flush(mock_redis)
+
+
+async def test_org_users_listing_is_one_query(client, mock_redis, monkeypatch):
+    redis = await mock_redis()
+    org_id = str(uuid4())
+    monkeypatch.setitem(plan_cache._plans, org_id, (time.monotonic() + 60, Plan.PREMIUM))
+    claims = {"user_id": USER_UUID, "org_roles": {org_id: ["admin"]}, "org": org_id, "scopes": ""}
+    token = await AuthJWT().create_access_token(subject=f"access.{USER_UUID}.agent", user_claims=claims)
+    await redis.set(f"refresh.{USER_UUID}.agent", "refresh token")
+    statements = count_statements(monkeypatch)
+
+    response = client.get(
+        "api/v1/users/",
+        params={"page_size": 50, "role": MembershipRole.COURIER.value, "status": UserStatus.ACTIVE.value},
+        headers={"Authorization": f"Bearer {token}", "X-Request-Id": "abcdefgh"},
+    )
+    assert response.status_code == 200
+    assert len(statements) == 1
+
+    sql = str(statements[0].compile(dialect=postgresql.dialect()))
+    # The page is cut by the filtering join, all memberships of the page are joined to it
+    page, memberships = sql.split(") AS anon_1 ")
+    assert "JOIN memberships AS memberships_2 ON memberships_2.user_id = users.id" in page
+    assert "memberships_2.role = " in page
+    assert "LIMIT" in page
+    assert memberships.startswith("LEFT OUTER JOIN memberships AS memberships_1 ON anon_1.id = memberships_1.user_id")
+
+    await redis_flush(mock_redis)
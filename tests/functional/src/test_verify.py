@@ -0,0 +1,183 @@
+import time
+from uuid import uuid4
+
+import orjson
+import pytest
+
+from constants import Plan
+from core.settings import settings
+from models import User
+from security.jwt_auth import AuthJWT
+from security.quotas import PLAN_POLICIES, plan_cache
+from security.rate_limit import GATEWAY_POLICY
+from security.revocation import revoke_token
+from tests.functional.settings import test_settings  # noqa
+from tests.functional.testdata.data import USER_UUID
+from tests.functional.utils import get_headers, redis_flush
+
+pytestmark = pytest.mark.asyncio
+
+ORG_ID = str(uuid4())
+GATEWAY = ("gateway", "secret")
+
+
+async def create_token(redis, user_id: str = USER_UUID) -> str:
+    claims = {"user_id": user_id, "org_roles": {ORG_ID: ["courier"]}, "org": None, "scopes": ""}
+    token = await AuthJWT().create_access_token(subject=f"access.{user_id}.agent", user_claims=claims)
+    await redis.set(f"refresh.{user_id}.agent", "refresh token")
+    return token
+
+
+async def test_batch_verification(client, mock_redis, monkeypatch):
+    redis = await mock_redis()
+    queries = []
+
+    async def get_statuses(ids):
+        queries.append(sorted(ids))
+        return {USER_UUID: "active"}
+
+    monkeypatch.setattr(User, "get_statuses", get_statuses)
+    monkeypatch.setattr(settings, "verify_clients", dict([GATEWAY]))
+    valid, revoked, unknown = await create_token(redis), await create_token(redis), await create_token(redis, "other")
+    await revoke_token(redis, await AuthJWT().get_raw_jwt(revoked))
+
+    response = client.post(
+        "api/v1/verify/tokens",
+        json={
+            "tokens": [
+                {"token": valid},
+                {"token": valid, "org_id": ORG_ID},
+                {"token": valid, "org_id": str(uuid4())},
+                {"token": revoked},
+                {"token": unknown},
+                {"token": "garbage"},
+            ]
+        },
+        headers=await get_headers(),
+        auth=GATEWAY,
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert results[0]["claims"]["org"] is None
+    assert results[1]["claims"]["org"] == ORG_ID
+    assert "couriers:read" in results[1]["claims"]["scopes"]
+    assert [result["error"] for result in results[2:]] == [
+        "org_forbidden",
+        "revoked",
+        "user_not_found",
+        "invalid_token",
+    ]
+    assert queries == [sorted([USER_UUID, "other"])]
+
+    for auth in (None, ("gateway", "wrong"), ("other", "secret")):
+        response = client.post(
+            "api/v1/verify/tokens", json={"tokens": [{"token": valid}]}, headers=await get_headers(), auth=auth
+        )
+        assert response.status_code == 401
+        assert response.headers["WWW-Authenticate"] == "Basic"
+
+    # An empty IP bucket rejects the call before the credentials are checked
+    await redis.hset(GATEWAY_POLICY.bucket_key("testclient"), mapping={"t": 0, "ts": time.time() + 60})
+    response = client.post(
+        "api/v1/verify/tokens", json={"tokens": [{"token": valid}]}, headers=await get_headers(), auth=GATEWAY
+    )
+    assert response.status_code == 429
+
+    await redis_flush(mock_redis)
+
+
+async def test_introspection(client, mock_redis, monkeypatch):
+    redis = await mock_redis()
+    loads = []
+
+    async def get_by_id(id_, without_memberships=False):
+        loads.append(str(id_))
+
+    monkeypatch.setattr(User, "get_by_id", get_by_id)
+    monkeypatch.setattr(settings, "verify_clients", dict([GATEWAY]))
+    headers = await get_headers()
+    active, revoked = await create_token(redis), await create_token(redis)
+    await revoke_token(redis, await AuthJWT().get_raw_jwt(revoked))
+    await redis.set(f"user.{USER_UUID}", orjson.dumps({"id": USER_UUID, "status": "active"}))
+
+    response = client.post("api/v1/verify/introspect", json={"token": active}, headers=headers, auth=GATEWAY)
+    assert response.status_code == 200
+    assert response.json()["active"] is True
+    assert response.json()["user_id"] == USER_UUID
+    max_age = int(response.headers["Cache-Control"].removeprefix("max-age="))
+    assert 0 < max_age <= settings.authjwt_access_token_expires.total_seconds()
+    assert loads == []
+
+    for token in (revoked, "garbage", await create_token(redis, str(uuid4()))):
+        response = client.post("api/v1/verify/introspect", json={"token": token}, headers=headers, auth=GATEWAY)
+        assert response.json() == {"active": False}
+        assert response.headers["Cache-Control"] == "no-store"
+
+    assert len(loads) == 1
+
+    response = client.post("api/v1/verify/introspect", json={"token": active}, headers=headers)
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Basic"
+
+    await redis_flush(mock_redis)
+
+
+async def test_auth_request(client, mock_redis, monkeypatch):
+    redis = await mock_redis()
+    monkeypatch.setitem(plan_cache._plans, ORG_ID, (time.monotonic() + 60, Plan.PREMIUM))
+    token = await create_token(redis)
+
+    def check(token: str | None, **headers):
+        headers["X-Request-Id"] = "abcdefgh"
+        if token is not None:
+            headers["Authorization"] = f"Bearer {token}"
+        return client.get("api/v1/verify/auth", headers=headers)
+
+    response = check(token, **{"X-Required-Scopes": "couriers:read_self routes:read_self"})
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["X-User-Id"] == USER_UUID
+    assert response.headers["X-Org-Id"] == ORG_ID
+    assert "couriers:read_self" in response.headers["X-Scopes"].split()
+
+    assert check(token, **{"X-Required-Scopes": "couriers:read"}).status_code == 403
+    assert check(token, **{"X-Org-ID": str(uuid4())}).status_code == 403
+    assert check(None).status_code == 401
+    assert check("garbage").status_code == 401
+
+    # An exhausted organization quota keeps Retry-After on the 403
+    monkeypatch.setitem(plan_cache._plans, ORG_ID, (time.monotonic() + 60, Plan.FREE))
+    await redis.hset(PLAN_POLICIES[Plan.FREE].bucket_key(f"org.{ORG_ID}"), mapping={"t": 0, "ts": time.time() + 60})
+    response = check(token)
+    assert response.status_code == 403
+    assert int(response.headers["Retry-After"]) > 0
+
+    await redis_flush(mock_redis)
+
+
+async def test_permission_checks(client, mock_redis):
+    redis = await mock_redis()
+    token = await create_token(redis)
+    other_org = str(uuid4())
+
+    response = client.post(
+        "api/v1/verify/permissions",
+        json={
+            "checks": [
+                {"scope": "couriers:read_self", "org_id": ORG_ID},
+                {"scope": "couriers:read", "org_id": ORG_ID},
+                {"scope": "couriers:read_self", "org_id": other_org},
+            ]
+        },
+        headers={"Authorization": f"Bearer {token}", "X-Request-Id": "abcdefgh"},
+    )
+    assert response.status_code == 200
+    assert [result["allowed"] for result in response.json()] == [True, False, False]
+    assert response.json()[2] == {"scope": "couriers:read_self", "org_id": other_org, "allowed": False}
+
+    response = client.post(
+        "api/v1/verify/permissions", json={"checks": [{"scope": "x", "org_id": ORG_ID}]}, headers=await get_headers()
+    )
+    assert response.status_code == 401
+
+    await redis_flush(mock_redis)
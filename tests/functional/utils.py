@@ -1,19 +1,26 @@
+import importlib
+from contextlib import asynccontextmanager
 from hashlib import md5
 from uuid import UUID
 
 import orjson
-from async_fastapi_jwt_auth import AuthJWT
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.engine.result import IteratorResult, SimpleResultMetaData
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from constants import DEFAULT_ORG_ID
 
 # Rules import removed - using membership-based system now
 from schemas import UserResponse
+from security.jwt_auth import AuthJWT
 from tests.functional.redis import redis
 from tests.functional.settings import test_settings  # noqa
 
 
 async def generate_tokens(user: dict, authorize: AuthJWT = AuthJWT(), user_agent: str = "testclient") -> dict:
     user = UserResponse.parse_obj({**user, "id": "345fa6c5-c138-4f5c-bce5-a35b0f26fced"})
-    user_claims = orjson.loads(user.json())
+    user_claims = {**orjson.loads(user.json()), "user_id": str(user.id)}
     user_agent_hash = md5(user_agent.encode()).hexdigest()
 
     access_key = f"access.{user.id}.{user_agent_hash}"
@@ -22,7 +29,7 @@ async def generate_tokens(user: dict, authorize: AuthJWT = AuthJWT(), user_agent
     refresh_key = f"refresh.{user.id}.{user_agent_hash}"
     refresh_token = await authorize.create_refresh_token(subject=refresh_key, user_claims=user_claims)
 
-    await redis.setex(name=refresh_key, time=None, value=refresh_token)
+    await redis.set(name=refresh_key, value=refresh_token)
 
     return {
         "access_token": access_token,
@@ -57,3 +64,43 @@ async def get_admin_headers():
 async def redis_flush(mock_redis):
     redis = await mock_redis()
     await redis.flush()
+
+
+# Modules that open database sessions
+SESSION_MODULES = (
+    "api.v1.users",
+    "api.v1.organizations",
+    "models.history",
+    "models.membership",
+    "models.mixins",
+    "models.organization",
+    "models.user",
+)
+
+
+def count_statements(monkeypatch, rows: tuple = ()) -> list:
+    """Statements the ORM executes during the test, every session of the service is counted.
+
+    Sessions are real AsyncSessions without a database, each statement is answered with `rows`.
+    """
+
+    statements = []
+
+    @asynccontextmanager
+    async def counting_session(org_id=DEFAULT_ORG_ID):
+        session = AsyncSession()
+
+        @event.listens_for(session.sync_session, "do_orm_execute")
+        def record(orm_execute_state):
+            statements.append(orm_execute_state.statement)
+            return IteratorResult(SimpleResultMetaData(["row"]), iter(rows))
+
+        yield session
+
+    for name in SESSION_MODULES:
+        module = importlib.import_module(name)
+        for session_factory in ("get_session", "get_read_session"):
+            if hasattr(module, session_factory):
+                monkeypatch.setattr(module, session_factory, counting_session)
+
+    return statements